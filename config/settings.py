@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+from datetime import timedelta
 from pathlib import Path
 import os
 import dotenv
@@ -79,6 +80,28 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'config.wsgi.application'
 
+# Runtime profile. "full" (default) serves the admin, the Swagger/Redoc UIs and
+# the browsable API. "api" keeps only what the JWT-authenticated JSON endpoints
+# need, which cuts import time on cold serverless workers. Select it with
+# DJANGO_RUNTIME_PROFILE=api; `manage.py bench_startup` compares the two.
+RUNTIME_PROFILE = os.environ.get('DJANGO_RUNTIME_PROFILE', 'full')
+API_ONLY = RUNTIME_PROFILE == 'api'
+
+if API_ONLY:
+    INSTALLED_APPS = [
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'shop',
+        'rest_framework',
+        'rest_framework_simplejwt',
+        'django_filters',
+    ]
+    MIDDLEWARE = [
+        'django.middleware.security.SecurityMiddleware',
+        'django.middleware.common.CommonMiddleware',
+    ]
+    TEMPLATES = []
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
@@ -106,7 +129,7 @@ AUTH_USER_MODEL = 'shop.User'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'shop.tokens.RevocationCheckingJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -117,6 +140,68 @@ REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
 }
 
+# JWT: refresh tokens rotate on every use and the presented one is revoked
+# (shop.RevokedToken), so clients refresh instead of re-posting credentials.
+SIMPLE_JWT = {
+    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=5),
+    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
+    'SLIDING_TOKEN_LIFETIME': timedelta(minutes=5),
+    'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=1),
+    'ROTATE_REFRESH_TOKENS': True,
+    'AUTH_TOKEN_CLASSES': (
+        'rest_framework_simplejwt.tokens.AccessToken',
+        'rest_framework_simplejwt.tokens.SlidingToken',
+    ),
+    'TOKEN_REFRESH_SERIALIZER': 'shop.tokens.RotatingTokenRefreshSerializer',
+    'SLIDING_TOKEN_REFRESH_SERIALIZER': 'shop.tokens.RotatingSlidingRefreshSerializer',
+    'TOKEN_BLACKLIST_SERIALIZER': 'shop.tokens.RevokeTokenSerializer',
+}
+
+if API_ONLY:
+    # JSON only, and keep @extend_schema from importing the spectacular
+    # introspection machinery; /api/schema/ serves the prebuilt artifact.
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = ('rest_framework.renderers.JSONRenderer',)
+    REST_FRAMEWORK['DEFAULT_SCHEMA_CLASS'] = 'rest_framework.schemas.inspectors.ViewInspector'
+
+# Seconds to cache product facet counts per filter signature
+PRODUCT_FACETS_CACHE_TIMEOUT = int(os.environ.get('PRODUCT_FACETS_CACHE_TIMEOUT', 60))
+
+# Seconds a product's price/stock may be served from cache by the cart quote
+# endpoint (0 disables); product saves evict their entry immediately
+QUOTE_CACHE_TIMEOUT = int(os.environ.get('QUOTE_CACHE_TIMEOUT', 5))
+
+# Live event stream (/api/events/, ASGI only): events kept for Last-Event-ID
+# resume, per-client queue bound, and keepalive interval in seconds
+EVENT_STREAM_HISTORY = 1000
+EVENT_STREAM_CLIENT_BUFFER = 100
+EVENT_STREAM_KEEPALIVE = 15
+
+# Delta sync batch sizes (change-log entries per response)
+SYNC_BATCH_SIZE = 500
+SYNC_MAX_BATCH_SIZE = 5000
+
+# Change-log rows younger than this are withheld from sync tokens until any
+# transaction that inserted an older row has had time to commit
+SYNC_SETTLE_SECONDS = int(os.environ.get('SYNC_SETTLE_SECONDS', 15))
+
+# Where build_catalog_snapshot writes the compressed catalog files
+CATALOG_SNAPSHOT_DIR = os.environ.get('CATALOG_SNAPSHOT_DIR', BASE_DIR / 'var' / 'catalog')
+
+# Catalog writes roll the snapshot forward (in the background) once it is this
+# many change-log rows or seconds behind
+CATALOG_SNAPSHOT_REBUILD_CHANGES = int(os.environ.get('CATALOG_SNAPSHOT_REBUILD_CHANGES', 500))
+CATALOG_SNAPSHOT_REBUILD_SECONDS = int(os.environ.get('CATALOG_SNAPSHOT_REBUILD_SECONDS', 300))
+
+# Paid orders older than this are moved to the archive tables by archive_orders
+ORDER_ARCHIVE_AFTER_DAYS = int(os.environ.get('ORDER_ARCHIVE_AFTER_DAYS', 180))
+
+# Recommendations kept per product by build_recommendations
+RECOMMENDATIONS_TOP_K = int(os.environ.get('RECOMMENDATIONS_TOP_K', 10))
+
+# Prebuilt schema written by build_openapi_schema and served at /api/schema/;
+# committed so serverless deployments bundle it
+OPENAPI_SCHEMA_PATH = os.environ.get('OPENAPI_SCHEMA_PATH', BASE_DIR / 'openapi.json')
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
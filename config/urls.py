@@ -14,26 +14,33 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.conf import settings
 from django.urls import path, include
-from drf_spectacular.views import (
-    SpectacularAPIView,
-    SpectacularSwaggerView,
-    SpectacularRedocView,
-)
+from shop.openapi import CachedSchemaView
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/', include('shop.urls')),
-    path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
-    path(
-        'api/schema/swagger-ui/',
-        SpectacularSwaggerView.as_view(url_name='schema'),
-        name='swagger-ui'
-    ),
-    path(
-        'api/schema/redoc/',
-        SpectacularRedocView.as_view(url_name='schema'),
-        name='redoc'
-    ),
+    path('api/schema/', CachedSchemaView.as_view(), name='schema'),
 ]
+
+if not settings.API_ONLY:
+    # Admin and docs UIs are left out of the API-only runtime profile
+    from django.contrib import admin
+    from drf_spectacular.views import (
+        SpectacularSwaggerView,
+        SpectacularRedocView,
+    )
+
+    urlpatterns += [
+        path('admin/', admin.site.urls),
+        path(
+            'api/schema/swagger-ui/',
+            SpectacularSwaggerView.as_view(url_name='schema'),
+            name='swagger-ui'
+        ),
+        path(
+            'api/schema/redoc/',
+            SpectacularRedocView.as_view(url_name='schema'),
+            name='redoc'
+        ),
+    ]
@@ -1,3 +1,206 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.functional import cached_property
 
-# Register your models here.
+from .events import publish_payment_status, publish_stock
+from .models import User, Category, Product, Order, OrderItem, CatalogChange
+from .quotes import forget_products
+from .summaries import affected_users, record_orders_paid, recount_users
+from .sync import record_changes
+
+# Ids per UPDATE when an action runs over "select all"
+ACTION_CHUNK = 1000
+
+
+def chunked(ids):
+    for start in range(0, len(ids), ACTION_CHUNK):
+        yield ids[start:start + ACTION_CHUNK]
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses PostgreSQL's planner estimate instead of COUNT(*) for unfiltered
+    changelists of big tables. Filtered lists and small tables get the
+    exact count.
+    """
+    estimate_threshold = 100_000
+
+    @cached_property
+    def count(self):
+        qs = self.object_list
+        connection = connections[qs.db]
+        if connection.vendor == 'postgresql' and not qs.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                    [qs.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+            if row and row[0] >= self.estimate_threshold:
+                return row[0]
+        return super().count
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_display = ('id', 'username', 'email', 'role', 'is_staff', 'is_active')
+    list_filter = ('role', 'is_staff', 'is_active')
+    fieldsets = BaseUserAdmin.fieldsets + (('Shop', {'fields': ('role',)}),)
+    add_fieldsets = BaseUserAdmin.add_fieldsets + (('Shop', {'fields': ('role',)}),)
+
+
+@admin.register(Category)
+class CategoryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'updated_at')
+    search_fields = ('name',)
+
+
+class StockAdjustForm(ActionForm):
+    stock_delta = forms.IntegerField(required=False, label='Stock change')
+
+
+@admin.register(Product)
+class ProductAdmin(LargeTableAdmin):
+    list_display = ('id', 'name', 'seller', 'category', 'price', 'stock', 'updated_at')
+    list_select_related = ('seller', 'category')
+    list_filter = ('category',)
+    search_fields = ('name',)
+    raw_id_fields = ('seller',)
+    autocomplete_fields = ('category',)
+    action_form = StockAdjustForm
+    actions = ['adjust_stock']
+
+    @admin.action(description='Adjust stock of selected products by "Stock change"')
+    def adjust_stock(self, request, queryset):
+        try:
+            delta = int(request.POST.get('stock_delta') or 0)
+        except ValueError:
+            delta = 0
+        if not delta:
+            self.message_user(request, 'Enter a non-zero stock change.', messages.ERROR)
+            return
+
+        ids = list(queryset.values_list('id', flat=True))
+        updated = 0
+        with transaction.atomic():
+            for chunk in chunked(ids):
+                # Decrements skip rows that would go below zero
+                updated += Product.objects.filter(id__in=chunk, stock__gte=max(-delta, 0)).update(
+                    stock=F('stock') + delta, updated_at=timezone.now()
+                )
+            # queryset.update() sends no signals: log changes for sync/quotes ourselves
+            record_changes(CatalogChange.PRODUCT, ids)
+            forget_products(ids)
+            for chunk in chunked(ids):
+                publish_stock(Product.objects.filter(id__in=chunk).values('id', 'stock', 'seller_id'))
+        skipped = len(ids) - updated
+        self.message_user(request, f'Adjusted stock by {delta:+d} on {updated} products'
+                          + (f'; skipped {skipped} without enough stock.' if skipped else '.'))
+
+
+class OrderItemInline(admin.TabularInline):
+    model = OrderItem
+    raw_id_fields = ('product',)
+    extra = 0
+
+
+@admin.register(Order)
+class OrderAdmin(LargeTableAdmin):
+    list_display = ('id', 'customer', 'created_at', 'payment_status', 'updated_at')
+    list_select_related = ('customer',)
+    list_filter = ('payment_status',)
+    raw_id_fields = ('customer',)
+    date_hierarchy = 'created_at'
+    inlines = [OrderItemInline]
+    actions = ['mark_paid']
+
+    @admin.action(description='Mark selected orders as paid')
+    def mark_paid(self, request, queryset):
+        updated = 0
+        with transaction.atomic():
+            ids = list(
+                queryset.filter(payment_status=Order.UNPAID).select_for_update().values_list('id', flat=True)
+            )
+            for chunk in chunked(ids):
+                updated += Order.objects.filter(id__in=chunk).update(
+                    payment_status=Order.PAID, updated_at=timezone.now()
+                )
+                record_orders_paid(chunk)
+                publish_payment_status(chunk)
+        self.message_user(request, f'Marked {updated} orders as paid.')
+
+    # The change form can edit payment_status, the customer and the items in
+    # one save; recount everyone the order counted for before and after.
+    def save_model(self, request, obj, form, change):
+        if change:
+            obj._was_paid = Order.objects.select_for_update().filter(
+                pk=obj.pk, payment_status=Order.PAID
+            ).exists()
+            obj._summary_users = affected_users([obj.pk])
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        order = form.instance
+        if form.has_changed() or any(formset.has_changed() for formset in formsets):
+            recount_users(getattr(order, '_summary_users', set()) | affected_users([order.pk]))
+        if getattr(order, '_was_paid', False) != (order.payment_status == Order.PAID):
+            publish_payment_status([order.pk])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            users = affected_users([obj.pk])
+            super().delete_model(request, obj)
+            recount_users(users)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            ids = list(queryset.values_list('id', flat=True))
+            users = set()
+            for chunk in chunked(ids):
+                users |= affected_users(chunk)
+            super().delete_queryset(request, queryset)
+            recount_users(users)
+
+
+@admin.register(OrderItem)
+class OrderItemAdmin(LargeTableAdmin):
+    list_display = ('id', 'order', 'product', 'quantity')
+    list_select_related = ('order', 'product')
+    raw_id_fields = ('order', 'product')
+
+    # Same upkeep as OrderAdmin: an item's quantity or order moves summary figures
+    def save_model(self, request, obj, form, change):
+        with transaction.atomic():
+            users = affected_users([form.initial['order']]) if change else set()
+            super().save_model(request, obj, form, change)
+            recount_users(users | affected_users([obj.order_id]))
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            users = affected_users([obj.order_id])
+            super().delete_model(request, obj)
+            recount_users(users)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            order_ids = list(queryset.values_list('order_id', flat=True).distinct())
+            users = set()
+            for chunk in chunked(order_ids):
+                users |= affected_users(chunk)
+            super().delete_queryset(request, queryset)
+            recount_users(users)
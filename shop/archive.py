@@ -0,0 +1,37 @@
+# core/archive.py
+from django.db import transaction
+
+from .models import Order, OrderItem, ArchivedOrder, ArchivedOrderItem
+
+
+def archivable_orders(cutoff):
+    return Order.objects.filter(payment_status=Order.PAID, created_at__lt=cutoff)
+
+
+def archive_batch(cutoff, batch_size):
+    """
+    Move up to `batch_size` paid orders created before `cutoff` (and their
+    items) into the archive tables in one transaction. Returns the number of
+    orders moved; 0 means there is nothing left to archive.
+
+    Each batch commits on its own, so an interrupted run simply resumes with
+    the orders still in the hot table. Rows locked by another archiver are
+    skipped rather than waited on.
+    """
+    with transaction.atomic():
+        ids = list(
+            archivable_orders(cutoff)
+            .select_for_update(skip_locked=True)
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return 0
+
+        orders = Order.objects.filter(id__in=ids).values('id', 'customer_id', 'created_at', 'payment_status')
+        items = OrderItem.objects.filter(order_id__in=ids).values('id', 'order_id', 'product_id', 'quantity')
+        ArchivedOrder.objects.bulk_create([ArchivedOrder(**row) for row in orders])
+        ArchivedOrderItem.objects.bulk_create([ArchivedOrderItem(**row) for row in items])
+        OrderItem.objects.filter(order_id__in=ids).delete()
+        Order.objects.filter(id__in=ids).delete()
+    return len(ids)
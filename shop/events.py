@@ -0,0 +1,158 @@
+# core/events.py
+import asyncio
+import json
+import secrets
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import Order, OrderItem
+
+STOCK = 'stock'
+PAYMENT = 'payment'
+
+
+class Event:
+    __slots__ = ('epoch', 'id', 'type', 'data', 'seller_ids', 'customer_id')
+
+    def __init__(self, epoch, id, type, data, seller_ids=(), customer_id=None):
+        self.epoch = epoch
+        self.id = id
+        self.type = type
+        self.data = data
+        self.seller_ids = frozenset(seller_ids)
+        self.customer_id = customer_id
+
+    def visible_to(self, user):
+        role = getattr(user, 'role', None)
+        if role == 'admin':
+            return True
+        if role == 'seller':
+            return user.pk in self.seller_ids
+        # Customers see catalog stock and their own orders
+        return self.type == STOCK or self.customer_id == user.pk
+
+    def encode(self):
+        return f'id: {self.epoch}-{self.id}\nevent: {self.type}\ndata: {json.dumps(self.data)}\n\n'
+
+
+class Subscription:
+    """One connected client: a bounded queue fed from any thread."""
+    OVERFLOW = object()
+
+    def __init__(self, user, loop, maxsize):
+        self.user = user
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.closed = False
+        self.backlog = []
+
+    def push(self, event):
+        if event.visible_to(self.user):
+            self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: stop feeding it; it reconnects with Last-Event-ID
+            self.closed = True
+            self.queue.get_nowait()
+            self.queue.put_nowait(self.OVERFLOW)
+
+
+class EventBroker:
+    """
+    In-process fan-out of stock and payment events. Recent events are kept so
+    a reconnecting client can resume from its last event id. Ids are
+    "<epoch>-<seq>" with a random per-process epoch, so an id from another
+    process (or from before a restart) is answered with a reset. Run the
+    event stream on a single ASGI process (or pin clients to one) when
+    scaling out.
+    """
+
+    def __init__(self, history, client_buffer):
+        self._lock = threading.Lock()
+        self.epoch = secrets.token_hex(4)
+        self._last_id = 0
+        self._history = deque(maxlen=history)
+        self._subscribers = set()
+        self.client_buffer = client_buffer
+
+    def publish(self, type, data, seller_ids=(), customer_id=None):
+        with self._lock:
+            self._last_id += 1
+            event = Event(self.epoch, self._last_id, type, data, seller_ids, customer_id)
+            self._history.append(event)
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            try:
+                subscription.push(event)
+            except RuntimeError:  # its event loop is gone
+                self.unsubscribe(subscription)
+
+    def subscribe(self, user, loop, last_event_id=None):
+        """
+        Register a client. Returns the subscription and whether the client
+        missed events that are no longer buffered (it should refetch state).
+        `last_event_id` is the raw Last-Event-ID the client sent.
+        """
+        subscription = Subscription(user, loop, self.client_buffer)
+        with self._lock:
+            self._subscribers.add(subscription)
+            history = list(self._history)
+            newest = self._last_id
+        gap = False
+        if last_event_id is not None:
+            epoch, _, seq = last_event_id.partition('-')
+            if epoch != self.epoch or not seq.isdigit() or int(seq) > newest:
+                gap, seq = True, 0  # not ours: refetch, then replay what is buffered
+            else:
+                seq = int(seq)
+                gap = bool(history) and seq + 1 < history[0].id
+            subscription.backlog = [e for e in history if e.id > seq and e.visible_to(user)]
+        return subscription, gap
+
+    def unsubscribe(self, subscription):
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+
+broker = EventBroker(settings.EVENT_STREAM_HISTORY, settings.EVENT_STREAM_CLIENT_BUFFER)
+
+
+def publish_stock(products):
+    """
+    Queue stock events for `products` (dicts with id, stock and seller_id),
+    sent once the current transaction commits.
+    """
+    rows = [(row['id'], row['stock'], row['seller_id']) for row in products]
+
+    def send():
+        for product_id, stock, seller_id in rows:
+            broker.publish(STOCK, {'product': product_id, 'stock': stock}, seller_ids=[seller_id])
+
+    transaction.on_commit(send)
+
+
+def publish_payment_status(order_ids):
+    """Queue payment-status events for orders, sent once the current transaction commits."""
+    order_ids = list(order_ids)
+
+    def send():
+        sellers = {}
+        for order_id, seller_id in OrderItem.objects.filter(order_id__in=order_ids).values_list(
+                'order_id', 'product__seller_id'):
+            sellers.setdefault(order_id, set()).add(seller_id)
+        for row in Order.objects.filter(id__in=order_ids).values('id', 'payment_status', 'customer_id'):
+            broker.publish(
+                PAYMENT, {'order': row['id'], 'payment_status': row['payment_status']},
+                seller_ids=sellers.get(row['id'], ()), customer_id=row['customer_id']
+            )
+
+    transaction.on_commit(send)
@@ -0,0 +1,37 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from shop.archive import archivable_orders, archive_batch
+
+
+class Command(BaseCommand):
+    help = 'Move settled (paid) orders older than a cutoff into the archive tables, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than-days', type=int, default=settings.ORDER_ARCHIVE_AFTER_DAYS)
+        parser.add_argument('--batch-size', type=int, default=500, help='Orders per transaction')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count archivable orders')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['older_than_days'])
+        if options['dry_run']:
+            count = archivable_orders(cutoff).count()
+            self.stdout.write(f"{count} paid orders created before {cutoff:%Y-%m-%d} would be archived")
+            return
+
+        total = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            moved = archive_batch(cutoff, options['batch_size'])
+            if not moved:
+                break
+            total += moved
+            batches += 1
+            self.stdout.write(f"Batch {batches}: archived {moved} orders ({total} total)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {total} orders created before {cutoff:%Y-%m-%d} in {batches} batches."
+        ))
@@ -0,0 +1,57 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password, check_password
+from django.core.management.base import BaseCommand
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+class Command(BaseCommand):
+    help = 'Compare CPU per session-hour: re-login on access expiry vs. refresh-token rotation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20, help='Samples per operation')
+
+    def cpu_per_call(self, fn, iterations):
+        fn()  # warm up
+        start = time.process_time()
+        for _ in range(iterations):
+            fn()
+        return (time.process_time() - start) / iterations
+
+    def handle(self, *args, **options):
+        n = options['iterations']
+        # Unsaved user: this measures CPU (hashing, signing), not DB round trips
+        user = get_user_model()(pk=1, username='bench', role='customer')
+        encoded = make_password('pass1234')
+        refresh_str = str(RefreshToken.for_user(user))
+
+        def login():
+            # What TokenObtainPairView does after loading the user
+            check_password('pass1234', encoded)
+            refresh = RefreshToken.for_user(user)
+            str(refresh.access_token), str(refresh)
+
+        def refresh():
+            # What RotatingTokenRefreshSerializer does, minus its two small queries
+            token = RefreshToken(refresh_str)
+            access = str(token.access_token)
+            token.set_jti()
+            token.set_exp()
+            token.set_iat()
+            return access, str(token)
+
+        login_cpu = self.cpu_per_call(login, n)
+        refresh_cpu = self.cpu_per_call(refresh, n)
+
+        renewals = max(int(3600 // api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()), 1)
+        relogin_hour = renewals * login_cpu
+        refresh_hour = login_cpu + (renewals - 1) * refresh_cpu
+
+        self.stdout.write(f"login (PBKDF2 + token pair): {login_cpu * 1000:8.2f} ms CPU")
+        self.stdout.write(f"refresh (verify + rotate):   {refresh_cpu * 1000:8.2f} ms CPU")
+        self.stdout.write(f"token renewals per session-hour: {renewals}")
+        self.stdout.write(f"re-login pattern: {relogin_hour * 1000:8.1f} ms CPU / session-hour")
+        self.stdout.write(f"refresh pattern:  {refresh_hour * 1000:8.1f} ms CPU / session-hour")
+        self.stdout.write(self.style.SUCCESS(f"refresh uses {relogin_hour / refresh_hour:.1f}x less CPU"))
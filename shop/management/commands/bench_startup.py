@@ -0,0 +1,63 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter so every sample is a real cold start
+PROBE = r'''
+import json, sys, time
+from io import BytesIO
+start = time.perf_counter()
+import config.wsgi
+imported = time.perf_counter()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': sys.argv[1], 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'HTTP_HOST': 'localhost',
+    'wsgi.input': BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': sys.stderr,
+}
+status = []
+b''.join(config.wsgi.application(environ, lambda s, h, e=None: status.append(s)))
+done = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (done - imported) * 1000,
+    'status': status[0],
+    'modules': len(sys.modules),
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = 'Measure config.wsgi import time and time to first request for each runtime profile'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help='Cold starts per profile')
+        parser.add_argument('--path', default='/api/products/',
+                            help='Request path for the first request (unauthenticated, so no DB access)')
+        parser.add_argument('--profiles', nargs='+', default=['full', 'api'])
+
+    def handle(self, *args, **options):
+        for profile in options['profiles']:
+            env = dict(os.environ, DJANGO_RUNTIME_PROFILE=profile,
+                       DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'))
+            samples = []
+            for _ in range(options['runs']):
+                out = subprocess.run(
+                    [sys.executable, '-c', PROBE, options['path']],
+                    cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True
+                )
+                samples.append(json.loads(out.stdout.strip().splitlines()[-1]))
+
+            imports = [s['import_ms'] for s in samples]
+            firsts = [s['first_request_ms'] for s in samples]
+            totals = [i + f for i, f in zip(imports, firsts)]
+            self.stdout.write(
+                f"{profile:>5}: import {statistics.median(imports):7.1f} ms  "
+                f"first request {statistics.median(firsts):6.1f} ms  "
+                f"total {statistics.median(totals):7.1f} ms  "
+                f"(median of {len(samples)}, {samples[-1]['modules']} modules, {samples[-1]['status']})"
+            )
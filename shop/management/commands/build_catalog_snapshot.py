@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from shop.snapshot import build_snapshot, snapshot_dir
+
+
+class Command(BaseCommand):
+    help = 'Write a compressed catalog snapshot (categories and products) for static serving'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full', action='store_true',
+            help='Rebuild from the database instead of rolling the last snapshot forward'
+        )
+
+    def handle(self, *args, **options):
+        manifest = build_snapshot(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Snapshot at token {manifest['token']}: {manifest['categories']} categories, "
+            f"{manifest['products']} products in {snapshot_dir()}"
+        ))
+        for encoding, info in manifest['files'].items():
+            self.stdout.write(f"  {encoding}: {info['name']} ({info['size']} bytes, sha256 {info['sha256']})")
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from shop.openapi import generate_schema, read_meta, source_fingerprint, write_artifact
+
+
+class Command(BaseCommand):
+    help = 'Generate the OpenAPI schema artifact served at /api/schema/'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Exit with an error if the committed artifact is out of date instead of writing it'
+        )
+
+    def handle(self, *args, **options):
+        fingerprint = source_fingerprint()
+        if options['check']:
+            meta = read_meta()
+            if meta is None or meta.get('fingerprint') != fingerprint:
+                raise CommandError(f'{settings.OPENAPI_SCHEMA_PATH} is stale; run build_openapi_schema and commit it.')
+            self.stdout.write(f"{settings.OPENAPI_SCHEMA_PATH} is up to date (source {fingerprint[:12]})")
+            return
+        etag = write_artifact(fingerprint, generate_schema())
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {settings.OPENAPI_SCHEMA_PATH} (etag {etag[:12]}, source {fingerprint[:12]})"
+        ))
@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from shop.recommendations import build_recommendations, sparse
+
+
+class Command(BaseCommand):
+    help = 'Build "frequently bought together" recommendations from order history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recount all orders instead of only those since the last run')
+        parser.add_argument('--top-k', type=int, default=settings.RECOMMENDATIONS_TOP_K)
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Order items per counting chunk')
+
+    def handle(self, *args, **options):
+        if sparse is None:
+            self.stdout.write('SciPy not installed; counting pairs in pure Python.')
+        run = build_recommendations(
+            options['top_k'], options['chunk_size'], full=options['full'], log=self.stdout.write
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Recommendations built ({'full' if run.full else 'incremental'}) up to order #{run.last_order_id}."
+        ))
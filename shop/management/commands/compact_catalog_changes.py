@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from shop.models import CatalogChange
+from shop.sync import compact_changes
+
+
+class Command(BaseCommand):
+    help = 'Drop catalog change-log rows superseded by a newer change to the same object'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000, help='Change-log ids per delete')
+
+    def handle(self, *args, **options):
+        removed = compact_changes(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Removed {removed} superseded change rows; {CatalogChange.objects.count()} remain.'
+        ))
@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
+
+from shop.summaries import reconcile_range
+
+
+def _reconcile_chunk(lo, hi):
+    try:
+        return reconcile_range(lo, hi)
+    finally:
+        connection.close()  # each worker thread has its own connection
+
+
+class Command(BaseCommand):
+    help = 'Recompute customer and seller summaries from order history in parallel user-id chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000, help='User ids per chunk')
+        parser.add_argument('--workers', type=int, default=4, help='Parallel database connections (use 1 on SQLite)')
+
+    def handle(self, *args, **options):
+        bounds = get_user_model().objects.aggregate(lo=Min('id'), hi=Max('id'))
+        if bounds['lo'] is None:
+            self.stdout.write('No users.')
+            return
+
+        size = options['chunk_size']
+        chunks = [(lo, lo + size) for lo in range(bounds['lo'], bounds['hi'] + 1, size)]
+        customers = sellers = 0
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            for c, s in pool.map(lambda chunk: _reconcile_chunk(*chunk), chunks):
+                customers += c
+                sellers += s
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Reconciled {customers} customer and {sellers} seller summaries in {len(chunks)} chunks."
+        ))
@@ -0,0 +1,211 @@
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection
+from django.db.models import Sum
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from shop.models import Category, Product, Order, OrderItem
+from shop.summaries import affected_users, recount_users
+from shop.views import OrderViewSet
+
+PREFIX = 'stress_'
+
+
+class Command(BaseCommand):
+    help = 'Fire concurrent checkouts at a few hot products and verify stock is never oversold'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=3, help='Hot products to contend on')
+        parser.add_argument('--stock', type=int, default=100, help='Initial stock per product')
+        parser.add_argument('--orders', type=int, default=500, help='Checkout attempts')
+        parser.add_argument('--workers', type=int, default=32, help='Concurrent client threads')
+        parser.add_argument('--customers', type=int, default=20)
+        parser.add_argument('--max-quantity', type=int, default=3, help='Units per order line (1..N)')
+        parser.add_argument('--keep', action='store_true', help='Leave the seeded rows in place')
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG:
+            raise CommandError('Refusing to seed stress data with DEBUG off; point this at a local database.')
+        if connection.vendor == 'sqlite':
+            self.stdout.write(self.style.WARNING(
+                'SQLite serializes writers; expect "database is locked" errors rather than row-lock waits.'
+            ))
+
+        products, customers = self.seed(options)
+        try:
+            initial = {p.pk: p.stock for p in products}
+            deadlocks_before = self.pg_deadlocks()
+
+            results, lock_samples = self.run(products, customers, options)
+
+            deadlocks = self.pg_deadlocks() - deadlocks_before if deadlocks_before is not None else None
+            ok = self.report(results, lock_samples, deadlocks, initial, options)
+        finally:
+            if not options['keep']:
+                self.cleanup(products)
+        if not ok:
+            raise CommandError('Invariant violated: stock was oversold or went negative.')
+
+    # -- setup / teardown -------------------------------------------------
+
+    def seed(self, options):
+        # Remember what this run created so cleanup leaves pre-existing rows alone
+        User = get_user_model()
+        self.created_users = []
+        seller, created = User.objects.get_or_create(username=f'{PREFIX}seller', defaults={'role': 'seller'})
+        if created:
+            self.created_users.append(seller.pk)
+        category, created = Category.objects.get_or_create(name=f'{PREFIX}category')
+        self.created_category = category.pk if created else None
+        products = [
+            Product.objects.create(
+                seller=seller, category=category, name=f'{PREFIX}product_{i}',
+                price=10, stock=options['stock']
+            )
+            for i in range(options['products'])
+        ]
+        customers = []
+        for i in range(options['customers']):
+            customer, created = User.objects.get_or_create(username=f'{PREFIX}customer_{i}', defaults={'role': 'customer'})
+            if created:
+                self.created_users.append(customer.pk)
+            customers.append(customer)
+        return products, customers
+
+    def cleanup(self, products):
+        ids = [p.pk for p in products]
+        order_ids = list(Order.objects.filter(items__product_id__in=ids).values_list('pk', flat=True).distinct())
+        users = affected_users(order_ids)
+        Order.objects.filter(pk__in=order_ids).delete()
+        Product.objects.filter(pk__in=ids).delete()
+        # Reused stress_ accounts keep their own history; fix their summaries
+        recount_users(users - set(self.created_users))
+        get_user_model().objects.filter(pk__in=self.created_users).delete()
+        if self.created_category is not None:
+            Category.objects.filter(pk=self.created_category).delete()
+
+    # -- load ---------------------------------------------------------------
+
+    def run(self, products, customers, options):
+        view = OrderViewSet.as_view({'post': 'create'})
+        factory = APIRequestFactory()
+        remaining = iter(range(options['orders']))
+        take = threading.Lock()
+        results = []
+        done = threading.Event()
+        lock_samples = []
+
+        def worker():
+            try:
+                while True:
+                    with take:
+                        if next(remaining, None) is None:
+                            return
+                    lines = random.sample(products, k=random.randint(1, len(products)))
+                    data = {'items': [
+                        {'product': p.pk, 'quantity': random.randint(1, options['max_quantity'])} for p in lines
+                    ]}
+                    request = factory.post('/api/orders/', data, format='json')
+                    force_authenticate(request, user=random.choice(customers))
+                    start = time.perf_counter()
+                    try:
+                        status = view(request).status_code
+                        outcome = 'created' if status == 201 else f'http_{status}'
+                    except ValueError:
+                        outcome = 'insufficient_stock'
+                    except OperationalError as exc:
+                        message = str(exc).lower()
+                        outcome = 'deadlock' if 'deadlock' in message else (
+                            'lock_timeout' if 'lock' in message else 'db_error')
+                    results.append((outcome, time.perf_counter() - start))
+            finally:
+                connection.close()
+
+        def sampler():
+            # Fraction of time backends spend waiting on row/table locks (PostgreSQL)
+            try:
+                with connection.cursor() as cursor:
+                    while not done.wait(0.05):
+                        cursor.execute(
+                            "SELECT count(*) FROM pg_stat_activity "
+                            "WHERE datname = current_database() AND wait_event_type = 'Lock'"
+                        )
+                        lock_samples.append(cursor.fetchone()[0])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['workers'])]
+        watcher = threading.Thread(target=sampler) if connection.vendor == 'postgresql' else None
+        self.started = time.perf_counter()
+        if watcher:
+            watcher.start()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.elapsed = time.perf_counter() - self.started
+        done.set()
+        if watcher:
+            watcher.join()
+        return results, lock_samples
+
+    def pg_deadlocks(self):
+        if connection.vendor != 'postgresql':
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT deadlocks FROM pg_stat_database WHERE datname = current_database()")
+            return cursor.fetchone()[0]
+
+    # -- verification ---------------------------------------------------------
+
+    def report(self, results, lock_samples, deadlocks, initial, options):
+        outcomes = {}
+        for outcome, _ in results:
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+        latencies = sorted(latency for _, latency in results)
+        created = outcomes.get('created', 0)
+
+        self.stdout.write(f"{len(results)} checkouts in {self.elapsed:.2f}s with {options['workers']} workers")
+        self.stdout.write(f"  orders/second: {created / self.elapsed:.1f} created, {len(results) / self.elapsed:.1f} attempted")
+        if latencies:
+            p95 = latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0]
+            self.stdout.write(f"  latency: median {statistics.median(latencies) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms")
+        for outcome, count in sorted(outcomes.items()):
+            self.stdout.write(f"  {outcome}: {count} ({count / len(results):.1%})")
+        if deadlocks is not None:
+            self.stdout.write(f"  deadlocks (pg_stat_database): {deadlocks} ({deadlocks / max(len(results), 1):.2%} of attempts)")
+        if lock_samples:
+            waiting = sum(1 for n in lock_samples if n)
+            self.stdout.write(
+                f"  lock waits: backends waiting in {waiting / len(lock_samples):.1%} of samples, "
+                f"mean {statistics.mean(lock_samples):.2f} waiting"
+            )
+
+        ordered = dict(
+            OrderItem.objects.filter(product_id__in=initial)
+            .values_list('product_id')
+            .annotate(total=Sum('quantity'))
+        )
+        ok = True
+        for product in Product.objects.filter(pk__in=initial).order_by('pk'):
+            sold = ordered.get(product.pk, 0)
+            oversold = sold > initial[product.pk]
+            negative = product.stock < 0
+            lost_update = initial[product.pk] - sold != product.stock
+            status = 'OK'
+            if oversold or negative or lost_update:
+                ok = False
+                status = 'FAIL' + (' oversold' if oversold else '') + (' negative' if negative else '') + (
+                    ' stock/ledger mismatch' if lost_update else '')
+            self.stdout.write(
+                f"  product {product.pk}: initial {initial[product.pk]}, ordered {sold}, "
+                f"final stock {product.stock} -> {status}"
+            )
+        self.stdout.write(self.style.SUCCESS('Invariant holds.') if ok else self.style.ERROR('Invariant violated.'))
+        return ok
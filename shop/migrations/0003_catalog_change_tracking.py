@@ -0,0 +1,49 @@
+# Generated by Django 5.2.1 on 2026-10-18 22:58
+
+from django.db import migrations, models
+
+
+def seed_change_log(apps, schema_editor):
+    # Give existing rows a change token so a since=0 sync returns them
+    Category = apps.get_model('shop', 'Category')
+    Product = apps.get_model('shop', 'Product')
+    CatalogChange = apps.get_model('shop', 'CatalogChange')
+    CatalogChange.objects.bulk_create(
+        [CatalogChange(kind='category', object_id=pk) for pk in Category.objects.values_list('pk', flat=True)]
+        + [CatalogChange(kind='product', object_id=pk) for pk in Product.objects.values_list('pk', flat=True)],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0002_remove_order_status_remove_orderitem_price_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('category', 'Category'), ('product', 'Product')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('deleted', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'object_id'], name='shop_catalo_kind_88d8ca_idx')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:27
+
+from django.db import migrations
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+
+
+def _line_total(prefix=''):
+    # quantity at the current price, as OrderItem.total_price
+    return ExpressionWrapper(
+        F(f'{prefix}quantity') * F(f'{prefix}product__price'),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+def _accumulate(totals, rows, key):
+    for row in rows:
+        total = totals.setdefault(row.pop(key), dict.fromkeys(row, 0))
+        for field, value in row.items():
+            total[field] += value or 0
+
+
+def backfill_summaries(apps, schema_editor):
+    # 0006 created the summary tables empty; count the existing order history
+    # (hot and archived). Uses historical models only, so later schema or
+    # code changes cannot alter what this migration does.
+    models = {name: apps.get_model('shop', name) for name in (
+        'Order', 'OrderItem', 'ArchivedOrder', 'ArchivedOrderItem', 'CustomerSummary', 'SellerSummary'
+    )}
+
+    customers = {}
+    paid = Q(payment_status='paid')
+    for name in ('Order', 'ArchivedOrder'):
+        _accumulate(customers, models[name].objects.values('customer_id').annotate(
+            order_count=Count('id', distinct=True),
+            lifetime_spend=Sum(_line_total('items__')),
+            paid_order_count=Count('id', filter=paid, distinct=True),
+            paid_spend=Sum(_line_total('items__'), filter=paid),
+        ), 'customer_id')
+
+    sellers = {}
+    paid = Q(order__payment_status='paid')
+    for name in ('OrderItem', 'ArchivedOrderItem'):
+        _accumulate(sellers, models[name].objects.values('product__seller_id').annotate(
+            units_sold=Sum('quantity'),
+            revenue=Sum(_line_total()),
+            paid_units_sold=Sum('quantity', filter=paid),
+            paid_revenue=Sum(_line_total(), filter=paid),
+        ), 'product__seller_id')
+
+    # Replace anything counted incrementally since 0006 with the full recount
+    for name, totals in (('CustomerSummary', customers), ('SellerSummary', sellers)):
+        model = models[name]
+        model.objects.all().delete()
+        model.objects.bulk_create([model(pk=pk, **values) for pk, values in totals.items()], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0009_recommendations'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_summaries, migrations.RunPython.noop),
+    ]
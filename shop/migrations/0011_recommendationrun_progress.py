@@ -0,0 +1,23 @@
+# Generated by Django 5.2.1 on 2026-10-18 23:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('shop', '0010_backfill_account_summaries'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recommendationrun',
+            name='complete',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='recommendationrun',
+            name='started_after',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
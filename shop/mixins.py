@@ -0,0 +1,119 @@
+# core/mixins.py
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+
+
+class MultiGetMixin:
+    """
+    `?ids=1,2,3` on a list endpoint: fetch exactly those records with one
+    id__in query (role scoping still applies), return them in the requested
+    order and report which ids do not exist or are not visible to the caller.
+    """
+    multi_get_max_ids = 100
+
+    def get_multi_get_queryset(self):
+        return self.get_queryset()
+
+    def parse_ids(self, raw):
+        try:
+            ids = [int(part) for part in raw.split(',') if part.strip()]
+        except ValueError:
+            raise ValidationError({'ids': 'Expected a comma-separated list of integer ids.'})
+        if not ids:
+            raise ValidationError({'ids': 'At least one id is required.'})
+        ids = list(dict.fromkeys(ids))  # drop duplicates, keep order
+        if len(ids) > self.multi_get_max_ids:
+            raise ValidationError({'ids': f'At most {self.multi_get_max_ids} ids per request.'})
+        return ids
+
+    def multi_get(self, request):
+        ids = self.parse_ids(request.query_params['ids'])
+        found = {obj.pk: obj for obj in self.get_multi_get_queryset().filter(pk__in=ids)}
+        absent = [pk for pk in ids if pk not in found]
+        exists = set()
+        if absent:
+            model = self.get_queryset().model
+            exists = set(model._default_manager.filter(pk__in=absent).values_list('pk', flat=True))
+        return Response({
+            'results': self.get_serializer([found[pk] for pk in ids if pk in found], many=True).data,
+            'missing': [pk for pk in absent if pk not in exists],
+            'forbidden': [pk for pk in absent if pk in exists],
+        })
+
+
+class ConditionalGetMixin:
+    """
+    ETag/Last-Modified on list and retrieve. The version is read with one
+    aggregate query over `version_fields`; a matching If-None-Match or
+    If-Modified-Since gets a 304 before any object is loaded or serialized.
+    Lists only send Last-Modified when get_list_version() can date deletions.
+    """
+    version_fields = ('updated_at',)
+
+    def version_base(self, qs):
+        # Aggregate over the visible pks, not over qs itself: role scoping and
+        # filters join the same relations as version_fields (a seller's orders
+        # join items__product), which would hide other sellers' line changes.
+        return qs.model._default_manager.filter(pk__in=qs.values('pk'))
+
+    def get_list_version(self):
+        qs = self.version_base(self.filter_queryset(self.get_queryset()))
+        version = qs.aggregate(
+            count=Count('pk', distinct=True),
+            **{f'v{i}': Max(field) for i, field in enumerate(self.version_fields)}
+        )
+        stamps = [value for key, value in version.items() if key != 'count' and value]
+        # No Last-Modified: deleting a row changes the count but not MAX(updated_at),
+        # so If-Modified-Since alone could 304 a stale list. The ETag covers both.
+        return None, [version['count']] + stamps
+
+    def get_detail_version(self):
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        try:
+            qs = self.version_base(self.get_queryset().filter(**{self.lookup_field: lookup}))
+            version = qs.aggregate(
+                **{f'v{i}': Max(field) for i, field in enumerate(self.version_fields)}
+            )
+        except (ValueError, TypeError, DjangoValidationError):
+            return None, None
+        stamps = [value for value in version.values() if value]
+        if not stamps:
+            return None, None  # not found or not visible; let retrieve() answer
+        return max(stamps), stamps
+
+    def conditional(self, request, version, handler, *args, **kwargs):
+        last_modified, parts = version
+        if parts is None:
+            return handler(request, *args, **kwargs)
+
+        user = request.user
+        scope = [getattr(user, 'role', None), user.pk if getattr(user, 'role', None) != 'admin' else None]
+        signature = json.dumps(
+            [self.basename, self.action, sorted(request.query_params.items()), scope, parts],
+            default=str
+        )
+        etag = '"%s"' % hashlib.md5(signature.encode()).hexdigest()
+        stamp = int(last_modified.timestamp()) if last_modified else None
+
+        response = get_conditional_response(request, etag=etag, last_modified=stamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if stamp is not None:
+                response['Last-Modified'] = http_date(stamp)
+            patch_vary_headers(response, ['Authorization'])
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional(request, self.get_list_version(), super().list, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional(request, self.get_detail_version(), super().retrieve, *args, **kwargs)
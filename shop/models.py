@@ -15,6 +15,7 @@ class User(AbstractUser):
 # 2. Categories
 class Category(models.Model):
     name = models.CharField(max_length=100)
+    updated_at = models.DateTimeField(auto_now=True)
     def __str__(self):
         return self.name
 
@@ -26,17 +27,49 @@ class Product(models.Model):
     description = models.TextField(blank=True)
     price = models.DecimalField(max_digits=10, decimal_places=2)
     stock = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
     def __str__(self):
         return self.name
 
-# 4. Orders & Items
+# 4. Catalog change log (delta sync)
+class CatalogChange(models.Model):
+    """
+    One row per catalog write or delete. The auto-increment id is the
+    monotonic change token handed to syncing clients.
+    """
+    CATEGORY = 'category'
+    PRODUCT = 'product'
+    KIND_CHOICES = ((CATEGORY, 'Category'), (PRODUCT, 'Product'))
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['kind', 'object_id'])]
+
+# 5. Revoked JWTs (rotated or logged-out refresh/sliding tokens)
+class RevokedToken(models.Model):
+    """
+    Only revoked token ids are stored, and only until the token would have
+    expired anyway, so the table stays small.
+    """
+    jti = models.CharField(max_length=64, primary_key=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+# 6. Orders & Items
 class Order(models.Model):
     customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='orders')
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     PAID = 'paid'
     UNPAID = 'unpaid'
     PAYMENT_STATUS = ((PAID, 'Paid'), (UNPAID, 'Unpaid'))
     payment_status = models.CharField(max_length=10, choices=PAYMENT_STATUS, default=UNPAID)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # Used by archive_orders to find settled orders past the cutoff
+        indexes = [models.Index(fields=['payment_status', 'created_at'])]
 
     @property
     def total_amount(self):
@@ -57,4 +90,86 @@ class OrderItem(models.Model):
                 raise ValueError('Insufficient stock')
             self.product.stock -= self.quantity
             self.product.save()
-        super().save(*args, **kwargs)
\ No newline at end of file
+        super().save(*args, **kwargs)
+
+# 7. Archived (settled) orders
+class ArchivedOrder(models.Model):
+    """
+    Paid orders moved out of the hot Order table by `archive_orders`.
+    Ids are kept, so an order has the same id before and after archiving.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_orders')
+    created_at = models.DateTimeField(db_index=True)
+    payment_status = models.CharField(max_length=10, choices=Order.PAYMENT_STATUS, default=Order.PAID)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def total_amount(self):
+        return sum(item.total_price for item in self.items.all())
+
+class ArchivedOrderItem(models.Model):
+    id = models.BigIntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE, related_name='items')
+    product = models.ForeignKey(Product, on_delete=models.PROTECT, related_name='+')
+    quantity = models.PositiveIntegerField()
+    @property
+    def total_price(self):
+        return self.product.price * self.quantity
+
+
+# 8. Incrementally maintained account summaries
+class CustomerSummary(models.Model):
+    customer = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='customer_summary')
+    order_count = models.PositiveIntegerField(default=0)
+    lifetime_spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_order_count = models.PositiveIntegerField(default=0)
+    paid_spend = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+class SellerSummary(models.Model):
+    seller = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name='seller_summary')
+    units_sold = models.PositiveBigIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid_units_sold = models.PositiveBigIntegerField(default=0)
+    paid_revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+# 9. Precomputed "frequently bought together" recommendations
+class ProductCoPurchase(models.Model):
+    """
+    Number of orders containing both products, stored once per pair with
+    product_a < product_b. Kept so new orders can be folded in incrementally.
+    """
+    product_a = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    product_b = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['product_a', 'product_b'], name='unique_copurchase_pair')]
+        indexes = [models.Index(fields=['product_b'])]
+
+class ProductRecommendation(models.Model):
+    """Top-K co-purchased products per product, read by ProductViewSet.retrieve."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+    built_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [models.UniqueConstraint(fields=['product', 'rank'], name='unique_recommendation_rank')]
+
+class RecommendationRun(models.Model):
+    """
+    One row per build; last_order_id is the watermark for incremental builds.
+    It advances with every committed chunk, and `complete` stays False until
+    the top-K lists are rewritten, so an interrupted build resumes.
+    """
+    started_after = models.BigIntegerField(default=0)
+    last_order_id = models.BigIntegerField(default=0)
+    full = models.BooleanField(default=False)
+    # Runs from before resumable builds were always finished
+    complete = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,82 @@
+# core/quotes.py
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Product
+
+CACHE_PREFIX = 'shop:quote-product:'
+
+
+def _key(pk):
+    return f'{CACHE_PREFIX}{pk}'
+
+
+def forget_products(product_ids):
+    """
+    Drop cached price/stock rows; called whenever products change. Runs on
+    commit so a concurrent quote cannot re-cache the pre-commit values.
+    """
+    keys = [_key(pk) for pk in product_ids]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def load_products(product_ids, use_cache=True):
+    """
+    Return {id: {'id', 'price', 'stock', 'seller_id'}} from one narrow
+    values() query, serving rows cached in the last
+    QUOTE_CACHE_TIMEOUT seconds when allowed.
+    """
+    timeout = settings.QUOTE_CACHE_TIMEOUT
+    use_cache = use_cache and timeout > 0
+    rows = {}
+    if use_cache:
+        cached = cache.get_many([_key(pk) for pk in product_ids])
+        rows = {row['id']: row for row in cached.values()}
+    wanted = [pk for pk in product_ids if pk not in rows]
+    if wanted:
+        fetched = {
+            row['id']: row
+            for row in Product.objects.filter(id__in=wanted).values('id', 'price', 'stock', 'seller_id')
+        }
+        rows.update(fetched)
+        if use_cache and fetched:
+            cache.set_many({_key(pk): row for pk, row in fetched.items()}, timeout)
+    return rows
+
+
+def build_quote(lines, rows):
+    """
+    Price cart lines against product rows. Quantities of repeated products
+    are added up before checking them against stock.
+    """
+    requested = {}
+    for line in lines:
+        requested[line['product']] = requested.get(line['product'], 0) + line['quantity']
+
+    items, total = [], Decimal('0.00')
+    for line in lines:
+        row = rows.get(line['product'])
+        if row is None:
+            items.append({
+                'product': line['product'], 'quantity': line['quantity'], 'available': False,
+                'stock': None, 'unit_price': None, 'line_total': None,
+            })
+            continue
+        line_total = row['price'] * line['quantity']
+        total += line_total
+        items.append({
+            'product': line['product'],
+            'quantity': line['quantity'],
+            'available': requested[line['product']] <= row['stock'],
+            'stock': row['stock'],
+            'unit_price': str(row['price']),
+            'line_total': str(line_total),
+        })
+    return {
+        'items': items,
+        'total': str(total),
+        'all_available': all(item['available'] for item in items),
+    }
@@ -0,0 +1,181 @@
+# core/recommendations.py
+import heapq
+from collections import Counter
+from datetime import timedelta
+from itertools import combinations
+from operator import itemgetter
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import (
+    OrderItem, ArchivedOrderItem, ProductCoPurchase, ProductRecommendation, RecommendationRun
+)
+
+try:  # vectorized pair counting when SciPy is available
+    import numpy as np
+    from scipy import sparse
+except ImportError:
+    np = sparse = None
+
+# Orders younger than this are left for the next run, so a transaction that
+# commits late with a lower id is not skipped by the watermark.
+SETTLE_TIME = timedelta(minutes=1)
+WRITE_BATCH = 1000
+
+
+def iter_baskets(models, after_order_id, before, chunk_size):
+    """
+    Stream (order_id, product_id) rows from the item tables of `models`
+    merged by order and yield (baskets, last_order_id) roughly every
+    `chunk_size` rows. Baskets are sets of product ids; an order is never
+    split across chunks, so last_order_id can serve as a watermark.
+    """
+    streams = [
+        model.objects.filter(order_id__gt=after_order_id, order__created_at__lt=before)
+        .order_by('order_id')
+        .values_list('order_id', 'product_id')
+        .iterator(chunk_size=chunk_size)
+        for model in models
+    ]
+    rows = heapq.merge(*streams, key=itemgetter(0))
+    baskets, basket, current, seen = [], set(), None, 0
+    for order_id, product_id in rows:
+        if order_id != current:
+            if basket:
+                baskets.append(basket)
+            if seen >= chunk_size:
+                yield baskets, current
+                baskets, seen = [], 0
+            basket, current = set(), order_id
+        basket.add(product_id)
+        seen += 1
+    if basket:
+        baskets.append(basket)
+    if baskets:
+        yield baskets, current
+
+
+def count_pairs(baskets):
+    """Co-occurrence counts {(a, b): n} with a < b for a chunk of baskets."""
+    baskets = [basket for basket in baskets if len(basket) > 1]
+    if not baskets:
+        return Counter()
+    if sparse is None:
+        counts = Counter()
+        for basket in baskets:
+            counts.update(combinations(sorted(basket), 2))
+        return counts
+
+    # Orders x products incidence matrix; X.T @ X holds pair co-occurrences
+    products = np.array(sorted(set().union(*baskets)))
+    column = {pk: i for i, pk in enumerate(products.tolist())}
+    rows = np.repeat(np.arange(len(baskets)), [len(basket) for basket in baskets])
+    cols = np.fromiter((column[pk] for basket in baskets for pk in basket), dtype=np.int64, count=len(rows))
+    incidence = sparse.csr_matrix((np.ones(len(rows), dtype=np.int32), (rows, cols)),
+                                  shape=(len(baskets), len(products)))
+    co = sparse.triu(incidence.T @ incidence, k=1).tocoo()
+    return Counter(dict(zip(zip(products[co.row].tolist(), products[co.col].tolist()), co.data.tolist())))
+
+
+def merge_counts(counts):
+    """Add chunk counts onto the stored pair counts."""
+    pairs = list(counts.items())
+    for start in range(0, len(pairs), WRITE_BATCH):
+        batch = dict(pairs[start:start + WRITE_BATCH])
+        firsts = {a for a, _ in batch}
+        seconds = {b for _, b in batch}
+        existing = {
+            (a, b): n for a, b, n in ProductCoPurchase.objects.filter(
+                product_a_id__in=firsts, product_b_id__in=seconds
+            ).values_list('product_a_id', 'product_b_id', 'count')
+        }
+        ProductCoPurchase.objects.bulk_create(
+            [ProductCoPurchase(product_a_id=a, product_b_id=b, count=n + existing.get((a, b), 0))
+             for (a, b), n in batch.items()],
+            update_conflicts=True,
+            unique_fields=['product_a', 'product_b'],
+            update_fields=['count'],
+        )
+
+
+def rebuild_top_k(product_ids, top_k):
+    """Recompute the stored top-K neighbors of the given products, one batch per transaction."""
+    product_ids = sorted(product_ids)
+    now = timezone.now()
+    for start in range(0, len(product_ids), WRITE_BATCH):
+        chunk = set(product_ids[start:start + WRITE_BATCH])
+        candidates = {pk: [] for pk in chunk}
+        pairs = ProductCoPurchase.objects.filter(
+            Q(product_a_id__in=chunk) | Q(product_b_id__in=chunk)
+        ).values_list('product_a_id', 'product_b_id', 'count')
+        for a, b, n in pairs.iterator(chunk_size=WRITE_BATCH):
+            if a in chunk:
+                candidates[a].append((n, -b))
+            if b in chunk:
+                candidates[b].append((n, -a))
+
+        with transaction.atomic():
+            ProductRecommendation.objects.filter(product_id__in=chunk).delete()
+            ProductRecommendation.objects.bulk_create([
+                ProductRecommendation(product_id=pk, recommended_id=-neg_id, rank=rank, score=n, built_at=now)
+                for pk, found in candidates.items()
+                for rank, (n, neg_id) in enumerate(heapq.nlargest(top_k, found), start=1)
+            ], batch_size=WRITE_BATCH)
+
+
+def counted_products(after_order_id, up_to_order_id):
+    """Products of the orders a build has folded in, hot and archived."""
+    products = set()
+    for model in (ArchivedOrderItem, OrderItem):
+        products.update(
+            model.objects.filter(order_id__gt=after_order_id, order_id__lte=up_to_order_id)
+            .values_list('product_id', flat=True).distinct()
+        )
+    return products
+
+
+def start_run(full):
+    """The RecommendationRun to fill: an interrupted one, or a new one."""
+    last = RecommendationRun.objects.order_by('-id').first()
+    if not full and last is not None and not last.complete:
+        return last
+    if full:
+        with transaction.atomic():
+            ProductCoPurchase.objects.all().delete()
+            return RecommendationRun.objects.create(full=True, complete=False)
+    watermark = last.last_order_id if last is not None else 0
+    return RecommendationRun.objects.create(started_after=watermark, last_order_id=watermark, complete=False)
+
+
+def build_recommendations(top_k, chunk_size, full=False, log=None):
+    """
+    Fold orders placed since the last run (or, with `full`, all orders, hot
+    and archived) into the pair counts and refresh the affected products'
+    top-K lists. Returns the RecommendationRun.
+
+    Each chunk commits its counts together with the run's watermark, so no
+    lock is held for longer than one chunk and a build that dies part way
+    resumes after its last committed chunk.
+    """
+    run = start_run(full)
+    before = timezone.now() - SETTLE_TIME
+    for baskets, last_order_id in iter_baskets(
+            (ArchivedOrderItem, OrderItem), run.last_order_id, before, chunk_size):
+        counts = count_pairs(baskets)
+        with transaction.atomic():
+            merge_counts(counts)
+            RecommendationRun.objects.filter(pk=run.pk).update(last_order_id=last_order_id)
+        run.last_order_id = last_order_id
+        if log:
+            log(f'{len(baskets)} orders up to #{last_order_id}, {len(counts)} pairs')
+
+    touched = counted_products(run.started_after, run.last_order_id)
+    if run.full:
+        # Also clears lists of products no longer bought with anything
+        touched.update(ProductRecommendation.objects.values_list('product_id', flat=True).distinct())
+    rebuild_top_k(touched, top_k)
+    run.complete = True
+    run.save(update_fields=['complete'])
+    return run
@@ -1,3 +1,4 @@
+from drf_spectacular.contrib.rest_framework_simplejwt import SimpleJWTScheme
 from drf_spectacular.extensions import OpenApiAuthenticationExtension
 from rest_framework_simplejwt.authentication import JWTAuthentication
 
@@ -11,4 +12,8 @@ class JWTScheme(OpenApiAuthenticationExtension):
             'scheme': 'bearer',
             'bearerFormat': 'JWT',
             'description': 'Enter your JWT token in the format: Bearer <token>'
-        }
\ No newline at end of file
+        }
+
+class RevocationCheckingJWTScheme(SimpleJWTScheme):
+    # Same "jwtAuth" scheme as stock JWTAuthentication, which it extends
+    target_class = 'shop.tokens.RevocationCheckingJWTAuthentication'
@@ -1,6 +1,11 @@
 # core/serializers.py
+from django.db import transaction
 from rest_framework import serializers
-from .models import User, Category, Product, Order, OrderItem
+from .models import (
+    User, Category, Product, Order, OrderItem, ArchivedOrder, ArchivedOrderItem,
+    CustomerSummary, SellerSummary, ProductRecommendation
+)
+from .summaries import record_orders_created
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -23,13 +28,27 @@ class UserSerializer(serializers.ModelSerializer):
 class CategorySerializer(serializers.ModelSerializer):
     class Meta:
         model = Category
-        fields = ('id','name')
+        fields = ('id','name','updated_at')
 
 class ProductSerializer(serializers.ModelSerializer):
     seller = serializers.ReadOnlyField(source='seller.username')
     class Meta:
         model = Product
-        fields = ('id','seller','category','name','description','price','stock')
+        fields = ('id','seller','category','name','description','price','stock','updated_at')
+
+class RecommendationSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source='recommended_id')
+    name = serializers.ReadOnlyField(source='recommended.name')
+    price = serializers.DecimalField(source='recommended.price', max_digits=10, decimal_places=2, read_only=True)
+    class Meta:
+        model = ProductRecommendation
+        fields = ('id','name','price','score')
+
+class ProductDetailSerializer(ProductSerializer):
+    """Response shape of product retrieve: the product plus its precomputed recommendations."""
+    recommendations = RecommendationSerializer(many=True, read_only=True)
+    class Meta(ProductSerializer.Meta):
+        fields = ProductSerializer.Meta.fields + ('recommendations',)
 
 class OrderItemSerializer(serializers.ModelSerializer):
     product_detail = ProductSerializer(source='product', read_only=True)
@@ -47,7 +66,48 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def create(self, validated):
         items_data = validated.pop('items')
-        order = Order.objects.create(**validated)
-        for item in items_data:
-            OrderItem.objects.create(order=order, **item)
-        return order
\ No newline at end of file
+        with transaction.atomic():
+            order = Order.objects.create(**validated)
+            for item in items_data:
+                OrderItem.objects.create(order=order, **item)
+            record_orders_created([order.id])
+        return order
+
+class ArchivedOrderItemSerializer(serializers.ModelSerializer):
+    product_detail = ProductSerializer(source='product', read_only=True)
+    class Meta:
+        model = ArchivedOrderItem
+        fields = ('id','product','product_detail','quantity','total_price')
+
+class ArchivedOrderSerializer(serializers.ModelSerializer):
+    customer = serializers.ReadOnlyField(source='customer.username')
+    items = ArchivedOrderItemSerializer(many=True, read_only=True)
+    total_amount = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    class Meta:
+        model = ArchivedOrder
+        fields = ('id','customer','created_at','payment_status','items','total_amount','archived_at')
+        read_only_fields = fields
+
+
+class CustomerSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomerSummary
+        fields = ('order_count','lifetime_spend','paid_order_count','paid_spend','updated_at')
+
+class SellerSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = SellerSummary
+        fields = ('units_sold','revenue','paid_units_sold','paid_revenue','updated_at')
+
+class AccountSummarySerializer(serializers.Serializer):
+    user = serializers.IntegerField()
+    customer = CustomerSummarySerializer(allow_null=True)
+    seller = SellerSummarySerializer(allow_null=True)
+
+
+class QuoteLineSerializer(serializers.Serializer):
+    product = serializers.IntegerField(min_value=1)
+    quantity = serializers.IntegerField(min_value=1)
+
+class QuoteRequestSerializer(serializers.Serializer):
+    items = QuoteLineSerializer(many=True, allow_empty=False, max_length=200)
@@ -0,0 +1,32 @@
+# core/signals.py
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Category, Product, CatalogChange
+from .events import publish_stock
+from .quotes import forget_products
+from .sync import record_changes
+
+
+@receiver(post_save, sender=Category)
+def category_saved(sender, instance, **kwargs):
+    record_changes(CatalogChange.CATEGORY, [instance.pk])
+
+
+@receiver(post_delete, sender=Category)
+def category_deleted(sender, instance, **kwargs):
+    record_changes(CatalogChange.CATEGORY, [instance.pk], deleted=True)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, **kwargs):
+    # Also fires for stock decrements in OrderItem.save
+    record_changes(CatalogChange.PRODUCT, [instance.pk])
+    forget_products([instance.pk])
+    publish_stock([{'id': instance.pk, 'stock': instance.stock, 'seller_id': instance.seller_id}])
+
+
+@receiver(post_delete, sender=Product)
+def product_deleted(sender, instance, **kwargs):
+    record_changes(CatalogChange.PRODUCT, [instance.pk], deleted=True)
+    forget_products([instance.pk])
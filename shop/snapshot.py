@@ -0,0 +1,231 @@
+# core/snapshot.py
+import gzip
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+
+from django.conf import settings
+from django.db import connection
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from .models import Category, Product, CatalogChange
+from .serializers import CategorySerializer, ProductSerializer
+from .sync import changes_since, latest_token
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is always written
+    zstandard = None
+
+MANIFEST_NAME = 'manifest.json'
+KEEP_VERSIONS = 2
+ENCODINGS = {
+    'gzip': ('.json.gz', 'application/gzip'),
+    'zstd': ('.json.zst', 'application/zstd'),
+}
+
+_build_lock = threading.Lock()
+# Seconds between staleness checks triggered by catalog writes in one process
+CHECK_INTERVAL = 5
+_schedule_lock = threading.Lock()
+_pending = None  # threading.Timer of the next staleness check
+
+
+def snapshot_dir():
+    return str(settings.CATALOG_SNAPSHOT_DIR)
+
+
+def load_manifest():
+    try:
+        with open(os.path.join(snapshot_dir(), MANIFEST_NAME)) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None
+
+
+def _load_catalog(manifest):
+    path = os.path.join(snapshot_dir(), manifest['files']['gzip']['name'])
+    with gzip.open(path, 'rt') as fh:
+        return json.load(fh)
+
+
+def _full_catalog():
+    token = latest_token()
+    categories = CategorySerializer(Category.objects.order_by('id'), many=True).data
+    products = ProductSerializer(
+        Product.objects.select_related('seller').order_by('id').iterator(chunk_size=2000),
+        many=True
+    ).data
+    return token, list(categories), list(products)
+
+
+def _apply_changes(catalog):
+    """Roll a previously written catalog forward through the change log."""
+    token = catalog['token']
+    categories = {row['id']: row for row in catalog['categories']}
+    products = {row['id']: row for row in catalog['products']}
+    while True:
+        batch = changes_since(token, settings.SYNC_MAX_BATCH_SIZE)
+        for row in batch['categories']:
+            categories[row['id']] = row
+        for row in batch['products']:
+            products[row['id']] = row
+        for pk in batch['deleted']['categories']:
+            categories.pop(pk, None)
+        for pk in batch['deleted']['products']:
+            products.pop(pk, None)
+        token = batch['next']
+        if not batch['has_more']:
+            break
+    return (
+        token,
+        [categories[pk] for pk in sorted(categories)],
+        [products[pk] for pk in sorted(products)],
+    )
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as fh:
+        fh.write(data)
+    os.replace(tmp, path)
+
+
+def _prune(keep_tokens):
+    for name in os.listdir(snapshot_dir()):
+        if not name.startswith('catalog-'):
+            continue
+        token = name[len('catalog-'):].split('.', 1)[0]
+        if token.isdigit() and int(token) not in keep_tokens:
+            os.remove(os.path.join(snapshot_dir(), name))
+
+
+def build_snapshot(full=False):
+    """
+    Write a new versioned snapshot and return its manifest. Unless `full` is
+    set, the previous snapshot is rolled forward through the change log
+    instead of re-reading the whole catalog.
+    """
+    with _build_lock:
+        return _build(full)
+
+
+def _build(full):
+    os.makedirs(snapshot_dir(), exist_ok=True)
+    previous = None if full else load_manifest()
+    if previous is not None:
+        try:
+            token, categories, products = _apply_changes(_load_catalog(previous))
+        except (OSError, ValueError, KeyError):
+            previous = None
+    if previous is None:
+        token, categories, products = _full_catalog()
+    if previous is not None and token == previous['token']:
+        return previous
+
+    payload = json.dumps(
+        {'token': token, 'categories': categories, 'products': products},
+        cls=DjangoJSONEncoder, separators=(',', ':')
+    ).encode()
+    blobs = {'gzip': gzip.compress(payload, mtime=0)}
+    if zstandard is not None:
+        blobs['zstd'] = zstandard.ZstdCompressor(level=10).compress(payload)
+
+    files = {}
+    for encoding, blob in blobs.items():
+        name = f'catalog-{token}{ENCODINGS[encoding][0]}'
+        _write_atomic(os.path.join(snapshot_dir(), name), blob)
+        files[encoding] = {
+            'name': name,
+            'size': len(blob),
+            'sha256': hashlib.sha256(blob).hexdigest(),
+        }
+    manifest = {
+        'token': token,
+        'generated_at': timezone.now().isoformat(),
+        'categories': len(categories),
+        'products': len(products),
+        'files': files,
+    }
+    _write_atomic(
+        os.path.join(snapshot_dir(), MANIFEST_NAME),
+        json.dumps(manifest, indent=2).encode()
+    )
+    keep = {token}
+    if previous is not None:
+        keep.add(previous['token'])
+    _prune(keep)
+    return manifest
+
+
+def current_snapshot():
+    """
+    Return the newest written manifest as is; clients catch up from its token
+    through /api/sync/. Rebuilds run in the background after catalog writes
+    (schedule_rebuild) or from build_catalog_snapshot, so a request only
+    builds when no snapshot exists yet, and returns None if the directory
+    cannot be written (e.g. a read-only deployment).
+    """
+    manifest = load_manifest()
+    if manifest is None:
+        try:
+            manifest = build_snapshot()
+        except OSError:
+            return None
+    return manifest
+
+
+def _is_stale(manifest):
+    token = latest_token()
+    if token <= manifest['token']:
+        return False
+    behind = CatalogChange.objects.filter(id__gt=manifest['token'], id__lte=token).count()
+    age = timezone.now() - datetime.fromisoformat(manifest['generated_at'])
+    return (behind >= settings.CATALOG_SNAPSHOT_REBUILD_CHANGES
+            or age.total_seconds() >= settings.CATALOG_SNAPSHOT_REBUILD_SECONDS)
+
+
+def rebuild_if_stale():
+    """
+    Roll the snapshot forward once the change log is far enough ahead of it.
+    Skips (returns None) while another build in this process is running.
+    """
+    if not _build_lock.acquire(blocking=False):
+        return None
+    try:
+        manifest = load_manifest()
+        if manifest is None or not _is_stale(manifest):
+            return None
+        return _build(full=False)
+    finally:
+        _build_lock.release()
+
+
+def _rebuild_in_background():
+    global _pending
+    with _schedule_lock:
+        _pending = None
+    try:
+        rebuild_if_stale()
+    except OSError:  # read-only deployment; build_catalog_snapshot owns the files
+        pass
+    finally:
+        connection.close()  # this thread's own connection
+
+
+def schedule_rebuild():
+    """
+    Called on commit of catalog changes. Checks for a stale snapshot
+    CHECK_INTERVAL seconds later in a background thread, so the writing
+    request never waits for a rebuild and a burst of writes costs one check.
+    """
+    global _pending
+    with _schedule_lock:
+        if _pending is not None:
+            return
+        _pending = threading.Timer(CHECK_INTERVAL, _rebuild_in_background)
+        _pending.daemon = True
+        _pending.start()
@@ -0,0 +1,177 @@
+# core/summaries.py
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    Order, OrderItem, ArchivedOrder, ArchivedOrderItem, CustomerSummary, SellerSummary
+)
+
+CUSTOMER_FIELDS = {
+    False: ('order_count', 'lifetime_spend'),
+    True: ('paid_order_count', 'paid_spend'),
+}
+SELLER_FIELDS = {
+    False: ('units_sold', 'revenue'),
+    True: ('paid_units_sold', 'paid_revenue'),
+}
+
+
+def line_total(prefix=''):
+    # Same definition as OrderItem.total_price: quantity at the current price
+    return ExpressionWrapper(
+        F(f'{prefix}quantity') * F(f'{prefix}product__price'),
+        output_field=DecimalField(max_digits=14, decimal_places=2)
+    )
+
+
+def _bump(model, pk, deltas):
+    """Add (non-negative) `deltas` to one summary row, creating it on first use."""
+    updates = {field: F(field) + value for field, value in deltas.items()}
+    if model.objects.filter(pk=pk).update(updated_at=timezone.now(), **updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(pk=pk, **deltas)
+    except IntegrityError:  # created concurrently
+        model.objects.filter(pk=pk).update(updated_at=timezone.now(), **updates)
+
+
+def _apply(order_ids, paid):
+    count_field, spend_field = CUSTOMER_FIELDS[paid]
+    customers = (
+        Order.objects.filter(id__in=order_ids)
+        .values('customer_id')
+        .annotate(orders=Count('id', distinct=True), spend=Sum(line_total('items__')))
+    )
+    for row in customers:
+        _bump(CustomerSummary, row['customer_id'], {
+            count_field: row['orders'],
+            spend_field: row['spend'] or Decimal('0'),
+        })
+
+    units_field, revenue_field = SELLER_FIELDS[paid]
+    sellers = (
+        OrderItem.objects.filter(order_id__in=order_ids)
+        .values('product__seller_id')
+        .annotate(units=Sum('quantity'), revenue=Sum(line_total()))
+    )
+    for row in sellers:
+        _bump(SellerSummary, row['product__seller_id'], {
+            units_field: row['units'],
+            revenue_field: row['revenue'],
+        })
+
+
+def record_orders_created(order_ids):
+    """Count new orders. Call inside the writing transaction."""
+    _apply(order_ids, paid=False)
+
+
+def record_orders_paid(order_ids):
+    """Count orders that just became paid."""
+    _apply(order_ids, paid=True)
+
+
+def affected_users(order_ids):
+    """Ids of the customers and sellers whose summaries include these orders."""
+    customers = Order.objects.filter(id__in=order_ids).values_list('customer_id', flat=True)
+    sellers = OrderItem.objects.filter(order_id__in=order_ids).values_list('product__seller_id', flat=True)
+    return set(customers) | set(sellers)
+
+
+def recount_users(user_ids):
+    """
+    Recompute a few users' summaries from order history. Deleting or
+    un-paying an order recounts instead of subtracting: the figure added at
+    the time used that day's prices, and rows created before the summaries
+    existed never counted the order at all.
+    """
+    for pk in sorted(user_ids):
+        reconcile_range(pk, pk + 1)
+
+
+def _customer_totals(lo, hi):
+    paid = Q(payment_status=Order.PAID)
+    totals = {}
+    for model in (Order, ArchivedOrder):
+        rows = (
+            model.objects.filter(customer_id__gte=lo, customer_id__lt=hi)
+            .values('customer_id')
+            .annotate(
+                order_count=Count('id', distinct=True),
+                lifetime_spend=Sum(line_total('items__')),
+                paid_order_count=Count('id', filter=paid, distinct=True),
+                paid_spend=Sum(line_total('items__'), filter=paid),
+            )
+        )
+        for row in rows:
+            total = totals.setdefault(row.pop('customer_id'), dict.fromkeys(row, 0))
+            for field, value in row.items():
+                total[field] += value or 0
+    return totals
+
+
+def _seller_totals(lo, hi):
+    paid = Q(order__payment_status=Order.PAID)
+    totals = {}
+    for model in (OrderItem, ArchivedOrderItem):
+        rows = (
+            model.objects.filter(product__seller_id__gte=lo, product__seller_id__lt=hi)
+            .values('product__seller_id')
+            .annotate(
+                units_sold=Sum('quantity'),
+                revenue=Sum(line_total()),
+                paid_units_sold=Sum('quantity', filter=paid),
+                paid_revenue=Sum(line_total(), filter=paid),
+            )
+        )
+        for row in rows:
+            total = totals.setdefault(row.pop('product__seller_id'), dict.fromkeys(row, 0))
+            for field, value in row.items():
+                total[field] += value or 0
+    return totals
+
+
+def _lock(model, lo, hi):
+    return {row.pk: row for row in model.objects.select_for_update().filter(pk__gte=lo, pk__lt=hi)}
+
+
+def _store(model, existing, totals, fields):
+    changed, created = [], []
+    now = timezone.now()
+    for pk, row in existing.items():
+        values = totals.pop(pk, dict.fromkeys(fields, 0))
+        for field in fields:
+            setattr(row, field, values[field])
+        row.updated_at = now
+        changed.append(row)
+    for pk, values in totals.items():
+        created.append(model(pk=pk, **values))
+    model.objects.bulk_update(changed, list(fields) + ['updated_at'], batch_size=500)
+    model.objects.bulk_create(created, batch_size=500)
+    return len(changed) + len(created)
+
+
+def reconcile_range(lo, hi, attempts=3):
+    """Recompute the summaries of users with lo <= id < hi from order history."""
+    for attempt in range(attempts):
+        try:
+            with transaction.atomic():
+                # Lock existing rows before aggregating: a _bump() that committed
+                # earlier is in the totals, one still in flight waits and applies
+                # on top of the recount.
+                customer_rows = _lock(CustomerSummary, lo, hi)
+                seller_rows = _lock(SellerSummary, lo, hi)
+                customers = _store(CustomerSummary, customer_rows, _customer_totals(lo, hi),
+                                   CUSTOMER_FIELDS[False] + CUSTOMER_FIELDS[True])
+                sellers = _store(SellerSummary, seller_rows, _seller_totals(lo, hi),
+                                 SELLER_FIELDS[False] + SELLER_FIELDS[True])
+            return customers, sellers
+        except IntegrityError:
+            # A concurrent _bump() created a row in the range after the lock;
+            # go again so it is locked and recounted as well.
+            if attempt == attempts - 1:
+                raise
@@ -0,0 +1,108 @@
+# core/sync.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, Min, OuterRef
+from django.utils import timezone
+
+from .models import Category, Product, CatalogChange
+from .serializers import CategorySerializer, ProductSerializer
+
+
+def record_changes(kind, object_ids, deleted=False):
+    """
+    Append one change-log row per object. Call this for writes that bypass
+    model signals (queryset.update(), raw SQL) so syncing clients see them.
+    Once committed, the catalog snapshot is rolled forward if it fell behind.
+    """
+    from .snapshot import schedule_rebuild  # snapshot builds on this module
+
+    CatalogChange.objects.bulk_create(
+        [CatalogChange(kind=kind, object_id=pk, deleted=deleted) for pk in object_ids]
+    )
+    transaction.on_commit(schedule_rebuild)
+
+
+def latest_token():
+    """
+    Newest token that is safe to hand out. Ids are assigned at insert, not at
+    commit, so a newer row can be visible while an older one is still
+    uncommitted; only rows older than SYNC_SETTLE_SECONDS are handed out.
+    Scans back from the newest row, so it only reads the unsettled tail.
+    """
+    horizon = timezone.now() - timedelta(seconds=settings.SYNC_SETTLE_SECONDS)
+    return (
+        CatalogChange.objects.filter(created_at__lt=horizon)
+        .order_by('-id').values_list('id', flat=True).first()
+    ) or 0
+
+
+def catalog_version():
+    """(token, changed_at) of the newest change-log row; one index lookup."""
+    latest = CatalogChange.objects.order_by('-id').values_list('id', 'created_at').first()
+    return latest or (0, None)
+
+
+def changes_since(since, limit, user=None):
+    """
+    Return the catalog rows changed after `since`, at most `limit` change-log
+    entries at a time. Repeated changes to the same object inside a batch
+    collapse to its current state; deletions are returned as tombstones.
+    Sellers only receive upserts for their own products.
+    """
+    entries = list(
+        CatalogChange.objects.filter(id__gt=since, id__lte=latest_token())
+        .order_by('id')
+        .values('id', 'kind', 'object_id', 'deleted')[:limit]
+    )
+
+    latest = {}
+    for entry in entries:
+        latest[(entry['kind'], entry['object_id'])] = entry['deleted']
+
+    upserts = {CatalogChange.CATEGORY: [], CatalogChange.PRODUCT: []}
+    tombstones = {CatalogChange.CATEGORY: [], CatalogChange.PRODUCT: []}
+    for (kind, object_id), deleted in latest.items():
+        (tombstones if deleted else upserts)[kind].append(object_id)
+
+    categories = Category.objects.filter(id__in=upserts[CatalogChange.CATEGORY]).order_by('id')
+    products = Product.objects.select_related('seller').filter(
+        id__in=upserts[CatalogChange.PRODUCT]
+    ).order_by('id')
+    if getattr(user, 'role', None) == 'seller':
+        products = products.filter(seller=user)
+
+    return {
+        'since': since,
+        'next': entries[-1]['id'] if entries else since,
+        'has_more': len(entries) == limit,
+        'categories': CategorySerializer(categories, many=True).data,
+        'products': ProductSerializer(products, many=True).data,
+        'deleted': {
+            'categories': sorted(tombstones[CatalogChange.CATEGORY]),
+            'products': sorted(tombstones[CatalogChange.PRODUCT]),
+        },
+    }
+
+
+def compact_changes(batch_size=10000):
+    """
+    Delete change-log rows superseded by a newer row for the same object and
+    return how many were removed. Sync is state-based, so keeping the newest
+    row per object means a client at any older token still receives every
+    object changed after it. Only settled rows are touched; works through the
+    log in id ranges to keep each delete short.
+    """
+    horizon = latest_token()
+    newer = CatalogChange.objects.filter(
+        kind=OuterRef('kind'), object_id=OuterRef('object_id'), id__gt=OuterRef('id')
+    )
+    lo = CatalogChange.objects.aggregate(first=Min('id'))['first'] or horizon
+    removed = 0
+    while lo <= horizon:
+        hi = min(lo + batch_size, horizon + 1)
+        count, _ = CatalogChange.objects.filter(id__gte=lo, id__lt=hi).filter(Exists(newer)).delete()
+        removed += count
+        lo = hi
+    return removed
@@ -1,3 +1,436 @@
-from django.test import TestCase
+import asyncio
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import (
+    User, Category, Product, CatalogChange, Order, OrderItem, ArchivedOrder, CustomerSummary, SellerSummary,
+    ProductCoPurchase, RecommendationRun
+)
+from .events import EventBroker, STOCK
+from .recommendations import build_recommendations
+from .snapshot import current_snapshot, rebuild_if_stale
+from .summaries import reconcile_range
+from .sync import changes_since, compact_changes, latest_token
+
+
+class AccountSummaryTests(TestCase):
+    """CustomerSummary/SellerSummary stay equal to a recount of order history."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin1', password='pw', role='admin')
+        cls.customer = User.objects.create_user('customer1', password='pw', role='customer')
+        cls.seller = User.objects.create_user('seller1', password='pw', role='seller')
+        category = Category.objects.create(name='Books')
+        cls.product = Product.objects.create(
+            seller=cls.seller, category=category, name='Book', price=Decimal('10.00'), stock=100
+        )
+
+    def api(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def place_order(self, quantity=2):
+        response = self.api(self.customer).post(
+            '/api/orders/', {'items': [{'product': self.product.pk, 'quantity': quantity}]}, format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def assertSummaries(self, customer, seller):
+        row = CustomerSummary.objects.get(pk=self.customer.pk)
+        self.assertEqual(
+            (row.order_count, row.lifetime_spend, row.paid_order_count, row.paid_spend), customer
+        )
+        row = SellerSummary.objects.get(pk=self.seller.pk)
+        self.assertEqual((row.units_sold, row.revenue, row.paid_units_sold, row.paid_revenue), seller)
+
+    def test_create_counts_order(self):
+        self.place_order()
+        self.assertSummaries((1, Decimal('20.00'), 0, 0), (2, Decimal('20.00'), 0, 0))
+
+    def test_mark_paid_counts_paid_figures(self):
+        order_id = self.place_order()
+        response = self.api(self.admin).post(f'/api/orders/{order_id}/mark_paid/')
+        self.assertEqual(response.status_code, 200)
+        self.assertSummaries((1, Decimal('20.00'), 1, Decimal('20.00')), (2, Decimal('20.00'), 2, Decimal('20.00')))
+
+    def test_unpay_recounts(self):
+        order_id = self.place_order()
+        self.api(self.admin).post(f'/api/orders/{order_id}/mark_paid/')
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('100.00'))
+        response = self.api(self.admin).patch(f'/api/orders/{order_id}/', {'payment_status': Order.UNPAID})
+        self.assertEqual(response.status_code, 200)
+        self.assertSummaries((1, Decimal('200.00'), 0, 0), (2, Decimal('200.00'), 0, 0))
+
+    def test_delete_after_price_change(self):
+        order_id = self.place_order()
+        self.api(self.seller).patch(f'/api/products/{self.product.pk}/', {'price': '100.00'})
+        response = self.api(self.admin).delete(f'/api/orders/{order_id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertSummaries((0, 0, 0, 0), (0, 0, 0, 0))
+
+    def test_delete_order_placed_before_summaries(self):
+        # Not counted by record_orders_created, like orders older than the summary tables
+        kept = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=kept, product=self.product, quantity=1)
+        deleted = Order.objects.create(customer=self.customer)
+        OrderItem.objects.create(order=deleted, product=self.product, quantity=3)
+        response = self.api(self.admin).delete(f'/api/orders/{deleted.pk}/')
+        self.assertEqual(response.status_code, 204)
+        self.assertSummaries((1, Decimal('10.00'), 0, 0), (1, Decimal('10.00'), 0, 0))
+
+    def test_reconcile_matches_history(self):
+        paid = Order.objects.create(customer=self.customer, payment_status=Order.PAID)
+        OrderItem.objects.create(order=paid, product=self.product, quantity=1)
+        self.place_order(quantity=4)
+        CustomerSummary.objects.filter(pk=self.customer.pk).update(order_count=99)
+        reconcile_range(0, self.seller.pk + 1)
+        self.assertSummaries((2, Decimal('50.00'), 1, Decimal('10.00')), (5, Decimal('50.00'), 1, Decimal('10.00')))
+
+    def test_summary_endpoint(self):
+        self.place_order()
+        response = self.api(self.customer).get('/api/summary/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['customer']['order_count'], 1)
+        self.assertIsNone(response.data['seller'])
+
+    def admin_client(self):
+        User.objects.filter(pk=self.admin.pk).update(is_staff=True, is_superuser=True)
+        self.client.force_login(self.admin)
+        return self.client
+
+    def test_admin_change_form_recounts(self):
+        order_id = self.place_order()
+        item = OrderItem.objects.get(order_id=order_id)
+        response = self.admin_client().post(f'/admin/shop/order/{order_id}/change/', {
+            'customer': self.customer.pk, 'payment_status': Order.PAID,
+            'items-TOTAL_FORMS': 2, 'items-INITIAL_FORMS': 1,
+            'items-0-id': item.pk, 'items-0-order': order_id, 'items-0-product': self.product.pk,
+            'items-0-quantity': 2,
+            'items-1-order': order_id, 'items-1-product': self.product.pk, 'items-1-quantity': 3,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertSummaries((1, Decimal('50.00'), 1, Decimal('50.00')), (5, Decimal('50.00'), 5, Decimal('50.00')))
+
+    def test_admin_delete_selected_recounts(self):
+        order_id = self.place_order()
+        self.place_order(quantity=1)
+        response = self.admin_client().post('/admin/shop/order/', {
+            'action': 'delete_selected', '_selected_action': [order_id], 'post': 'yes',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertSummaries((1, Decimal('10.00'), 0, 0), (1, Decimal('10.00'), 0, 0))
+
+
+class ConditionalOrderListTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('admin1', password='pw', role='admin')
+        customer = User.objects.create_user('customer1', password='pw', role='customer')
+        cls.orders = [Order.objects.create(customer=customer) for _ in range(2)]
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_delete_changes_list_etag(self):
+        first = self.client.get('/api/orders/')
+        self.assertNotIn('Last-Modified', first)
+        self.assertEqual(self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        self.orders[0].delete()
+        self.assertEqual(self.client.get('/api/orders/', HTTP_IF_NONE_MATCH=first['ETag']).status_code, 200)
+
+    def test_archived_rows_change_etag(self):
+        first = self.client.get('/api/orders/', {'include_archived': 1})
+        order = self.orders[0]
+        ArchivedOrder.objects.create(id=order.pk + 100, customer=order.customer, created_at=order.created_at)
+        again = self.client.get('/api/orders/', {'include_archived': 1}, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(again.status_code, 200)
+
+    def test_other_sellers_product_changes_seller_etag(self):
+        # The order shows every line, so s2's rename must reach s1's ETag too
+        s1 = User.objects.create_user('seller1', password='pw', role='seller')
+        s2 = User.objects.create_user('seller2', password='pw', role='seller')
+        category = Category.objects.create(name='Books')
+        mine = Product.objects.create(seller=s1, category=category, name='Mine', price=1, stock=5)
+        theirs = Product.objects.create(seller=s2, category=category, name='Theirs', price=1, stock=5)
+        order = self.orders[0]
+        OrderItem.objects.create(order=order, product=mine, quantity=1)
+        OrderItem.objects.create(order=order, product=theirs, quantity=1)
+
+        client = APIClient()
+        client.force_authenticate(s1)
+        detail = client.get(f'/api/orders/{order.pk}/')
+        listing = client.get('/api/orders/')
+        theirs.name = 'Renamed'
+        theirs.save()
+        self.assertEqual(client.get(f'/api/orders/{order.pk}/', HTTP_IF_NONE_MATCH=detail['ETag']).status_code, 200)
+        self.assertEqual(client.get('/api/orders/', HTTP_IF_NONE_MATCH=listing['ETag']).status_code, 200)
+
+
+class MultiGetTests(TestCase):
+    """`?ids=` keeps role scoping, request order and the missing/forbidden split."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('seller1', password='pw', role='seller')
+        other_seller = User.objects.create_user('seller2', password='pw', role='seller')
+        cls.customer = User.objects.create_user('customer1', password='pw', role='customer')
+        other_customer = User.objects.create_user('customer2', password='pw', role='customer')
+        category = Category.objects.create(name='Books')
+        cls.own = [
+            Product.objects.create(seller=cls.seller, category=category, name=f'Own {i}', price=1, stock=1)
+            for i in range(2)
+        ]
+        cls.foreign = Product.objects.create(seller=other_seller, category=category, name='Foreign', price=1, stock=1)
+        cls.orders = [Order.objects.create(customer=cls.customer) for _ in range(2)]
+        cls.foreign_order = Order.objects.create(customer=other_customer)
+
+    def get(self, user, path, ids):
+        client = APIClient()
+        client.force_authenticate(user)
+        response = client.get(path, {'ids': ','.join(map(str, ids))})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_seller_products(self):
+        missing = self.foreign.pk + 1000
+        data = self.get(self.seller, '/api/products/', [self.own[1].pk, missing, self.foreign.pk, self.own[0].pk])
+        self.assertEqual([row['id'] for row in data['results']], [self.own[1].pk, self.own[0].pk])
+        self.assertEqual(data['missing'], [missing])
+        self.assertEqual(data['forbidden'], [self.foreign.pk])
+
+    def test_customer_orders(self):
+        missing = self.foreign_order.pk + 1000
+        data = self.get(
+            self.customer, '/api/orders/', [self.foreign_order.pk, self.orders[1].pk, missing, self.orders[0].pk]
+        )
+        self.assertEqual([row['id'] for row in data['results']], [self.orders[1].pk, self.orders[0].pk])
+        self.assertEqual(data['missing'], [missing])
+        self.assertEqual(data['forbidden'], [self.foreign_order.pk])
+
+    def test_rejects_bad_ids(self):
+        client = APIClient()
+        client.force_authenticate(self.customer)
+        self.assertEqual(client.get('/api/orders/', {'ids': '1,x'}).status_code, 400)
+
+
+class EventResumeTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = EventBroker(history=10, client_buffer=10)
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.user = User(pk=1, role='admin')
+        for stock in range(3):
+            self.broker.publish(STOCK, {'product': 1, 'stock': stock})
+
+    def resume(self, last_event_id):
+        subscription, gap = self.broker.subscribe(self.user, self.loop, last_event_id)
+        return [event.id for event in subscription.backlog], gap
+
+    def test_resume_in_same_process(self):
+        self.assertEqual(self.resume(f'{self.broker.epoch}-1'), ([2, 3], False))
+
+    def test_id_from_before_restart_resets(self):
+        self.assertEqual(self.resume('0123abcd-2'), ([1, 2, 3], True))
+        self.assertEqual(self.resume(f'{self.broker.epoch}-99'), ([1, 2, 3], True))
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0)
+class CatalogSyncTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user('seller1', password='pw', role='seller')
+        cls.other = User.objects.create_user('seller2', password='pw', role='seller')
+        cls.category = Category.objects.create(name='Books')
+        cls.mine = Product.objects.create(seller=cls.seller, category=cls.category, name='Mine', price=1, stock=5)
+        cls.theirs = Product.objects.create(seller=cls.other, category=cls.category, name='Theirs', price=1, stock=5)
+
+    def test_full_sync_then_tombstone(self):
+        first = changes_since(0, 100)
+        self.assertEqual([row['name'] for row in first['products']], ['Mine', 'Theirs'])
+        self.assertEqual(first['next'], latest_token())
+        theirs_id = self.theirs.pk
+        self.theirs.delete()
+        second = changes_since(first['next'], 100)
+        self.assertEqual(second['products'], [])
+        self.assertEqual(second['deleted'], {'categories': [], 'products': [theirs_id]})
+
+    def test_seller_only_gets_own_upserts(self):
+        result = changes_since(0, 100, user=self.seller)
+        self.assertEqual([row['id'] for row in result['products']], [self.mine.pk])
+
+    def test_batches(self):
+        first = changes_since(0, 2)
+        self.assertTrue(first['has_more'])
+        rest = changes_since(first['next'], 100)
+        self.assertFalse(rest['has_more'])
+        self.assertEqual(rest['next'], latest_token())
+        self.assertEqual(len(first['categories']) + len(first['products']) + len(rest['products']), 3)
+
+    def test_repeated_changes_collapse(self):
+        token = latest_token()
+        for stock in range(3):
+            self.mine.stock = stock
+            self.mine.save()
+        result = changes_since(token, 100)
+        self.assertEqual([(row['id'], row['stock']) for row in result['products']], [(self.mine.pk, 2)])
+
+    @override_settings(SYNC_SETTLE_SECONDS=60)
+    def test_unsettled_changes_are_withheld(self):
+        CatalogChange.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        token = latest_token()
+        self.mine.save()
+        self.assertEqual(latest_token(), token)
+        self.assertEqual(changes_since(token, 100)['next'], token)
+
+    def test_compaction_keeps_sync_results(self):
+        token = latest_token()
+        for stock in range(3):
+            self.mine.stock = stock
+            self.mine.save()
+        self.theirs.delete()
+        before = [changes_since(since, 100) for since in (0, token)]
+        # Three superseded saves of "Mine" and the insert row of deleted "Theirs"
+        self.assertEqual(compact_changes(batch_size=2), 4)
+        after = [changes_since(since, 100) for since in (0, token)]
+        for old, new in zip(before, after):
+            self.assertEqual((old['products'], old['deleted'], old['next']), (new['products'], new['deleted'], new['next']))
+
+
+@override_settings(SYNC_SETTLE_SECONDS=0, CATALOG_SNAPSHOT_REBUILD_CHANGES=2)
+class CatalogSnapshotTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('customer1', password='pw', role='customer')
+        cls.seller = User.objects.create_user('seller1', password='pw', role='seller')
+        cls.category = Category.objects.create(name='Books')
+        cls.product = Product.objects.create(seller=cls.seller, category=cls.category, name='Book', price=1, stock=5)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(CATALOG_SNAPSHOT_DIR=directory.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client = APIClient()
+        self.client.force_authenticate(self.customer)
+
+    def test_sellers_are_refused(self):
+        self.client.force_authenticate(self.seller)
+        self.assertEqual(self.client.get('/api/catalog/snapshot/').status_code, 403)
+
+    def test_multi_range_gets_whole_file(self):
+        self.assertEqual(self.client.get('/api/catalog/snapshot/', HTTP_RANGE='bytes=0-1').status_code, 206)
+        self.assertEqual(self.client.get('/api/catalog/snapshot/', HTTP_RANGE='bytes=0-1,5-6').status_code, 200)
+
+    def test_rebuilds_once_far_enough_behind(self):
+        token = current_snapshot()['token']
+        self.product.save()
+        self.assertIsNone(rebuild_if_stale())
+        self.product.save()
+        self.assertGreater(rebuild_if_stale()['token'], token)
+        self.assertEqual(self.client.get('/api/catalog/snapshot/')['X-Catalog-Token'], str(latest_token()))
+
+
+class TokenTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User.objects.create_user('customer1', password='pw12345!', role='customer')
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def post(self, path, data):
+        return self.client.post(f'/api/auth/token/{path}', data, format='json')
+
+    def authenticated_status(self, token):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        status = self.client.get('/api/summary/').status_code
+        self.client.credentials()
+        return status
+
+    def test_refresh_rotates_and_rejects_replay(self):
+        pair = self.post('', {'username': 'customer1', 'password': 'pw12345!'}).data
+        rotated = self.post('refresh/', {'refresh': pair['refresh']})
+        self.assertEqual(rotated.status_code, 200)
+        self.assertNotEqual(rotated.data['refresh'], pair['refresh'])
+        self.assertEqual(self.authenticated_status(rotated.data['access']), 200)
+        self.assertEqual(self.post('refresh/', {'refresh': pair['refresh']}).status_code, 401)
+        self.assertEqual(self.post('refresh/', {'refresh': rotated.data['refresh']}).status_code, 200)
+
+    def test_revoked_refresh_cannot_refresh(self):
+        pair = self.post('', {'username': 'customer1', 'password': 'pw12345!'}).data
+        self.assertEqual(self.post('revoke/', {'refresh': pair['refresh']}).status_code, 200)
+        self.assertEqual(self.post('refresh/', {'refresh': pair['refresh']}).status_code, 401)
+        self.assertEqual(self.post('revoke/', {'refresh': pair['refresh']}).status_code, 401)
+
+    def test_sliding_token_stops_authenticating_once_slid_or_revoked(self):
+        token = self.post('sliding/', {'username': 'customer1', 'password': 'pw12345!'}).data['token']
+        self.assertEqual(self.authenticated_status(token), 200)
+        slid = self.post('sliding/refresh/', {'token': token}).data['token']
+        self.assertEqual(self.authenticated_status(token), 401)
+        self.assertEqual(self.authenticated_status(slid), 200)
+        self.assertEqual(self.post('revoke/', {'refresh': slid}).status_code, 200)
+        self.assertEqual(self.authenticated_status(slid), 401)
+
+    def test_garbage_token_cannot_be_revoked(self):
+        self.assertEqual(self.post('revoke/', {'refresh': 'not-a-token'}).status_code, 401)
+
+
+class RecommendationBuildTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = seller = User.objects.create_user('seller1', password='pw', role='seller')
+        cls.customer = customer = User.objects.create_user('customer1', password='pw', role='customer')
+        category = Category.objects.create(name='Books')
+        cls.products = [
+            Product.objects.create(seller=seller, category=category, name=f'Book {i}', price=1, stock=100)
+            for i in range(3)
+        ]
+        for basket in ([0, 1], [0, 1, 2], [1, 2], [0, 2]):
+            order = Order.objects.create(customer=customer)
+            for i in basket:
+                OrderItem.objects.create(order=order, product=cls.products[i], quantity=1)
+        Order.objects.update(created_at=timezone.now() - timedelta(hours=1))
+
+    def pair_counts(self):
+        return sorted(ProductCoPurchase.objects.values_list('count', flat=True))
+
+    def test_interrupted_build_resumes_without_double_counting(self):
+        def crash(message):
+            raise RuntimeError(message)
+
+        with self.assertRaises(RuntimeError):
+            build_recommendations(top_k=2, chunk_size=2, log=crash)
+        run = RecommendationRun.objects.get()
+        self.assertFalse(run.complete)
+        self.assertEqual(self.pair_counts(), [1])  # first chunk committed
+
+        run = build_recommendations(top_k=2, chunk_size=2)
+        self.assertTrue(run.complete)
+        self.assertEqual(RecommendationRun.objects.count(), 1)
+        self.assertEqual(self.pair_counts(), [2, 2, 2])
+        ranked = self.products[0].recommendations.order_by('rank').values_list('recommended_id', flat=True)
+        self.assertEqual(list(ranked), [self.products[1].pk, self.products[2].pk])
+
+    def test_detail_lists_ranked_recommendations_in_scope(self):
+        build_recommendations(top_k=2, chunk_size=100)
+        other = User.objects.create_user('seller2', password='pw', role='seller')
+        Product.objects.filter(pk=self.products[2].pk).update(seller=other)
+        client = APIClient()
+        path = f'/api/products/{self.products[0].pk}/'
+
+        client.force_authenticate(self.customer)
+        ranked = [row['id'] for row in client.get(path).data['recommendations']]
+        self.assertEqual(ranked, [self.products[1].pk, self.products[2].pk])
+        client.force_authenticate(self.seller)
+        ranked = [row['id'] for row in client.get(path).data['recommendations']]
+        self.assertEqual(ranked, [self.products[1].pk])
@@ -0,0 +1,113 @@
+# core/tokens.py
+import random
+
+from django.db import IntegrityError, transaction
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenRefreshSerializer,
+    TokenRefreshSlidingSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken, SlidingToken
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .models import RevokedToken
+
+# Fraction of revocations that also sweep expired rows
+PRUNE_PROBABILITY = 0.01
+
+
+def revoke(token):
+    """
+    Record the token's jti as revoked. The insert doubles as the "already
+    used?" check, so two concurrent refreshes of one token cannot both win.
+    """
+    try:
+        with transaction.atomic():
+            RevokedToken.objects.create(
+                jti=token[api_settings.JTI_CLAIM],
+                expires_at=datetime_from_epoch(token['exp']),
+            )
+    except IntegrityError:
+        raise InvalidToken('Token has been revoked')
+    if random.random() < PRUNE_PROBABILITY:
+        RevokedToken.objects.filter(expires_at__lt=timezone.now()).delete()
+
+
+def check_user_active(token):
+    user_id = token.payload.get(api_settings.USER_ID_CLAIM)
+    user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+    if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+        raise AuthenticationFailed('No active account found for the given token.', 'no_active_account')
+
+
+class RevocationCheckingJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that also rejects revoked sliding tokens. Sliding
+    tokens authenticate directly, so logging out or sliding them forward has
+    to invalidate the old one; access tokens are short-lived and unchecked.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        if token.get(api_settings.TOKEN_TYPE_CLAIM) == SlidingToken.token_type and \
+                RevokedToken.objects.filter(pk=token.get(api_settings.JTI_CLAIM)).exists():
+            raise InvalidToken('Token has been revoked')
+        return token
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Exchange a refresh token for a new access token and a new refresh token.
+    The presented refresh token is revoked, so replaying it fails.
+    """
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        check_user_active(refresh)
+        revoke(refresh)
+
+        data = {'access': str(refresh.access_token)}
+        refresh.set_jti()
+        refresh.set_exp()
+        refresh.set_iat()
+        data['refresh'] = str(refresh)
+        return data
+
+
+class RotatingSlidingRefreshSerializer(TokenRefreshSlidingSerializer):
+    """
+    Extend a sliding session: the token gets a new jti and expiry (up to its
+    refresh_exp limit) and the presented one can no longer be refreshed.
+    """
+
+    def validate(self, attrs):
+        token = self.token_class(attrs['token'])
+        token.check_exp(api_settings.SLIDING_TOKEN_REFRESH_EXP_CLAIM)
+        check_user_active(token)
+        revoke(token)
+
+        token.set_jti()
+        token.set_exp()
+        token.set_iat()
+        return {'token': str(token)}
+
+
+class RevokeTokenSerializer(serializers.Serializer):
+    """Log out: revoke a refresh token or a sliding token."""
+    refresh = serializers.CharField(write_only=True)
+
+    def validate(self, attrs):
+        for token_class in (RefreshToken, SlidingToken):
+            try:
+                token = token_class(attrs['refresh'])
+                break
+            except TokenError:
+                continue
+        else:
+            raise InvalidToken('Token is invalid or expired')
+        revoke(token)
+        return {}
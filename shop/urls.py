@@ -1,19 +1,32 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from rest_framework_simplejwt.views import TokenObtainPairView  # <- import the APIView here
-from .views import RegisterView, CategoryViewSet, ProductViewSet, OrderViewSet
+from rest_framework_simplejwt.views import (  # <- import the APIViews here
+    TokenObtainPairView,
+    TokenRefreshView,
+    TokenObtainSlidingView,
+    TokenRefreshSlidingView,
+    TokenBlacklistView,
+)
+from .views import RegisterView, CategoryViewSet, ProductViewSet, OrderViewSet, SyncViewSet, CatalogSnapshotView, SummaryViewSet, event_stream
 
 router = DefaultRouter()
 router.register('auth/register', RegisterView, basename='register')
 router.register('categories', CategoryViewSet)
 router.register('products', ProductViewSet)
 router.register('orders', OrderViewSet)
+router.register('sync', SyncViewSet, basename='sync')
+router.register('summary', SummaryViewSet, basename='summary')
 
 urlpatterns = [
     # router-registered viewsets
     path('', include(router.urls)),
+    path('catalog/snapshot/', CatalogSnapshotView.as_view(), name='catalog_snapshot'),
+    path('events/', event_stream, name='events'),
 
     # explicit JWT endpoints
     path('auth/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
-    # path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
+    path('auth/token/revoke/', TokenBlacklistView.as_view(), name='token_revoke'),
+    path('auth/token/sliding/', TokenObtainSlidingView.as_view(), name='token_obtain_sliding'),
+    path('auth/token/sliding/refresh/', TokenRefreshSlidingView.as_view(), name='token_refresh_sliding'),
 ]
\ No newline at end of file
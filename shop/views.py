@@ -1,19 +1,51 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Max, Prefetch
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.generics import get_object_or_404
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django_filters.rest_framework import DjangoFilterBackend
 from drf_spectacular.utils import extend_schema, OpenApiParameter, OpenApiResponse, OpenApiExample
 
-from .models import User, Category, Product, Order
+from .events import broker, publish_payment_status
+from .mixins import ConditionalGetMixin, MultiGetMixin
+from .models import (
+    User, Category, Product, Order, OrderItem, ArchivedOrder, CustomerSummary, SellerSummary,
+    ProductRecommendation
+)
 from .serializers import (
     UserSerializer, 
     CategorySerializer, 
     ProductSerializer, 
-    OrderSerializer
+    ProductDetailSerializer,
+    OrderSerializer,
+    ArchivedOrderSerializer,
+    QuoteRequestSerializer,
+    AccountSummarySerializer
 )
 from .permissions import IsAdmin, IsSeller, IsCustomer
+from .quotes import build_quote, load_products
+from .snapshot import ENCODINGS, current_snapshot, snapshot_dir
+from .summaries import affected_users, recount_users, record_orders_paid
+from .sync import catalog_version, changes_since
+from .tokens import RevocationCheckingJWTAuthentication
 
 
 # 1. Auth endpoints
@@ -49,13 +81,18 @@ class JWTView(TokenObtainPairView):
 
 
 # 2. Category CRUD (Admin only)
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for category management (admin only).
     """
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     permission_classes = [IsAuthenticated & IsAdmin]
+
+    def get_list_version(self):
+        # Every category write appends to the catalog change log
+        token, changed_at = catalog_version()
+        return changed_at, [token]
     
     @extend_schema(
         description="List all categories",
@@ -110,7 +147,7 @@ class CategoryViewSet(viewsets.ModelViewSet):
 
 
 # 3. Product CRUD
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(ConditionalGetMixin, MultiGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for product management. 
     - Admins can see all products
@@ -122,6 +159,8 @@ class ProductViewSet(viewsets.ModelViewSet):
     filter_backends = [DjangoFilterBackend, filters.SearchFilter]
     filterset_fields = ['category__id']
     search_fields = ['name']
+    # Rebuilding recommendations or editing a recommended product changes the detail ETag
+    version_fields = ('updated_at', 'recommendations__built_at', 'recommendations__recommended__updated_at')
     
     def get_permissions(self):
         if not hasattr(self.request, 'user') or not self.request.user.is_authenticated:
@@ -137,6 +176,11 @@ class ProductViewSet(viewsets.ModelViewSet):
     
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user)
+
+    def get_list_version(self):
+        # Every product write, including stock changes, appends to the catalog change log
+        token, changed_at = catalog_version()
+        return changed_at, [token]
     
     def get_queryset(self):
         qs = super().get_queryset()
@@ -145,31 +189,145 @@ class ProductViewSet(viewsets.ModelViewSet):
         if not hasattr(self.request, 'user') or not self.request.user.is_authenticated:
             return qs
             
+        if self.action == 'retrieve':
+            qs = qs.prefetch_related(Prefetch('recommendations', queryset=self.get_recommendations_queryset()))
+
         if hasattr(self.request.user, 'role'):
             if self.request.user.role == 'seller':
                 return qs.filter(seller=self.request.user)
                 
         return qs
+
+    def get_serializer_class(self):
+        if self.action == 'retrieve':
+            return ProductDetailSerializer
+        return super().get_serializer_class()
+
+    def get_facets(self, request):
+        """
+        Per-category (and, for admins, per-seller) product counts for the
+        current search, computed with a single grouped query and cached per
+        filter signature. The category__id filter is not applied here so the
+        sidebar keeps showing counts for every category.
+        """
+        role = getattr(request.user, 'role', None)
+        include_sellers = role == 'admin'
+        params = sorted(
+            (key, value) for key, value in request.query_params.items()
+            if key not in ('facets', 'category__id')
+        )
+        scope = request.user.pk if role == 'seller' else role
+        signature = json.dumps([scope, params])
+        cache_key = 'shop:product-facets:' + hashlib.md5(signature.encode()).hexdigest()
+        facets = cache.get(cache_key)
+        if facets is not None:
+            return facets
+
+        qs = filters.SearchFilter().filter_queryset(request, self.get_queryset(), self)
+        group_by = ['category_id', 'category__name']
+        if include_sellers:
+            group_by += ['seller_id', 'seller__username']
+        rows = qs.order_by().values(*group_by).annotate(count=Count('id'))
+
+        categories, sellers = {}, {}
+        for row in rows:
+            category = categories.setdefault(
+                row['category_id'],
+                {'id': row['category_id'], 'name': row['category__name'], 'count': 0}
+            )
+            category['count'] += row['count']
+            if include_sellers:
+                seller = sellers.setdefault(
+                    row['seller_id'],
+                    {'id': row['seller_id'], 'username': row['seller__username'], 'count': 0}
+                )
+                seller['count'] += row['count']
+
+        facets = {'category': sorted(categories.values(), key=lambda c: c['name'])}
+        if include_sellers:
+            facets['seller'] = sorted(sellers.values(), key=lambda s: s['username'])
+        cache.set(cache_key, facets, settings.PRODUCT_FACETS_CACHE_TIMEOUT)
+        return facets
     
     @extend_schema(
-        description="List all products (filtered by seller for seller users)",
+        description=(
+            "List all products (filtered by seller for seller users). "
+            "With facets=true the response is wrapped as {results, facets} and "
+            "includes per-category counts (and per-seller counts for admins)."
+        ),
         parameters=[
             OpenApiParameter(name="category__id", type=int, description="Filter by category ID"),
-            OpenApiParameter(name="search", type=str, description="Search products by name")
+            OpenApiParameter(name="search", type=str, description="Search products by name"),
+            OpenApiParameter(name="facets", type=bool, description="Include category/seller facet counts"),
+            OpenApiParameter(name="ids", type=str, description="Comma-separated ids to fetch in one call; returns {results, missing, forbidden}")
         ],
         responses={200: ProductSerializer(many=True)},
         tags=["Products"]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        if 'ids' in request.query_params:
+            return self.multi_get(request)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200 and request.query_params.get('facets') in ('1', 'true', 'True'):
+            response.data = {'results': response.data, 'facets': self.get_facets(request)}
+        return response
     
     @extend_schema(
-        description="Retrieve a product",
-        responses={200: ProductSerializer},
+        description=(
+            "Check availability and price cart lines with one narrow query. "
+            "Repeated products are summed before comparing against stock."
+        ),
+        parameters=[
+            OpenApiParameter(name="fresh", type=bool, description="Bypass the short-lived price/stock cache")
+        ],
+        request=QuoteRequestSerializer,
+        responses={
+            200: OpenApiResponse(
+                description="Per-line availability and prices",
+                examples=[
+                    OpenApiExample(
+                        name="Success",
+                        value={
+                            "items": [{"product": 1, "quantity": 2, "available": True, "stock": 55,
+                                       "unit_price": "10.00", "line_total": "20.00"}],
+                            "total": "20.00",
+                            "all_available": True
+                        }
+                    )
+                ]
+            )
+        },
+        tags=["Products"]
+    )
+    @action(detail=False, methods=['post'])
+    def quote(self, request):
+        serializer = QuoteRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        lines = serializer.validated_data['items']
+        fresh = request.query_params.get('fresh') in ('1', 'true', 'True')
+        rows = load_products({line['product'] for line in lines}, use_cache=not fresh)
+        if getattr(request.user, 'role', None) == 'seller':
+            # Same scoping as get_queryset()
+            rows = {pk: row for pk, row in rows.items() if row['seller_id'] == request.user.pk}
+        return Response(build_quote(lines, rows))
+
+    @extend_schema(
+        description=(
+            "Retrieve a product with its precomputed \"frequently bought together\" "
+            "recommendations (see the build_recommendations command)"
+        ),
+        responses={200: ProductDetailSerializer},
         tags=["Products"]
     )
     def retrieve(self, request, *args, **kwargs):
         return super().retrieve(request, *args, **kwargs)
+
+    def get_recommendations_queryset(self):
+        # One indexed lookup on (product, rank); sellers only see their own products
+        qs = ProductRecommendation.objects.select_related('recommended').order_by('rank')
+        if getattr(self.request.user, 'role', None) == 'seller':
+            qs = qs.filter(recommended__seller=self.request.user)
+        return qs
     
     @extend_schema(
         description="Create a new product (seller and admin only)",
@@ -208,7 +366,7 @@ class ProductViewSet(viewsets.ModelViewSet):
 
 
 # 4. Orders
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(ConditionalGetMixin, MultiGetMixin, viewsets.ModelViewSet):
     """
     API endpoint for order management.
     - Customers can create orders
@@ -217,6 +375,8 @@ class OrderViewSet(viewsets.ModelViewSet):
     """
     queryset = Order.objects.prefetch_related('items__product')
     serializer_class = OrderSerializer
+    # Nested product_detail means a product change also changes the order
+    version_fields = ('updated_at', 'items__product__updated_at')
     filter_backends = [DjangoFilterBackend]
     filterset_fields = {
         'items__product__category__id': ['exact'],
@@ -241,8 +401,19 @@ class OrderViewSet(viewsets.ModelViewSet):
         return [p() for p in perms]
         
     def get_queryset(self):
-        qs = super().get_queryset()
-        
+        return self.scope_to_user(super().get_queryset())
+
+    def get_multi_get_queryset(self):
+        # One query for the orders, one for their items with product and seller
+        items = OrderItem.objects.select_related('product__seller')
+        return self.scope_to_user(
+            Order.objects.select_related('customer').prefetch_related(Prefetch('items', queryset=items))
+        )
+
+    def get_archived_queryset(self):
+        return self.scope_to_user(ArchivedOrder.objects.prefetch_related('items__product'))
+
+    def scope_to_user(self, qs):
         # Handle schema generation with AnonymousUser
         if not hasattr(self.request, 'user') or not self.request.user.is_authenticated:
             return qs
@@ -256,9 +427,40 @@ class OrderViewSet(viewsets.ModelViewSet):
                 
         # Admin sees all orders
         return qs
+
+    def include_archived(self):
+        return self.request.query_params.get('include_archived') in ('1', 'true', 'True')
+
+    def get_list_version(self):
+        last_modified, parts = super().get_list_version()
+        if self.include_archived():
+            archived = self.filter_queryset(self.get_archived_queryset()).aggregate(
+                count=Count('pk', distinct=True), archived_at=Max('archived_at')
+            )
+            parts = parts + [archived['count'], archived['archived_at']]
+        return last_modified, parts
     
     def perform_create(self, serializer):
         serializer.save(customer=self.request.user)
+
+    def perform_update(self, serializer):
+        # Keep the paid figures in CustomerSummary/SellerSummary in step
+        with transaction.atomic():
+            was_paid = Order.objects.select_for_update().get(pk=serializer.instance.pk).payment_status == Order.PAID
+            order = serializer.save()
+            is_paid = order.payment_status == Order.PAID
+            if was_paid != is_paid:
+                if is_paid:
+                    record_orders_paid([order.pk])
+                else:
+                    recount_users(affected_users([order.pk]))
+                publish_payment_status([order.pk])
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            users = affected_users([instance.pk])
+            instance.delete()
+            recount_users(users)
     
     @extend_schema(
         description="List orders (filtered by user role)",
@@ -266,21 +468,39 @@ class OrderViewSet(viewsets.ModelViewSet):
             OpenApiParameter(name="items__product__category__id", type=int, description="Filter by product category ID"),
             OpenApiParameter(name="items__product__id", type=int, description="Filter by product ID"),
             OpenApiParameter(name="created_at__gte", type=str, description="Filter by date greater than or equal (YYYY-MM-DD)"),
-            OpenApiParameter(name="created_at__lte", type=str, description="Filter by date less than or equal (YYYY-MM-DD)")
+            OpenApiParameter(name="created_at__lte", type=str, description="Filter by date less than or equal (YYYY-MM-DD)"),
+            OpenApiParameter(name="include_archived", type=bool, description="Also return archived (settled) orders"),
+            OpenApiParameter(name="ids", type=str, description="Comma-separated ids to fetch in one call; returns {results, missing, forbidden}")
         ],
         responses={200: OrderSerializer(many=True)},
         tags=["Orders"]
     )
     def list(self, request, *args, **kwargs):
-        return super().list(request, *args, **kwargs)
+        if 'ids' in request.query_params:
+            return self.multi_get(request)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200 and self.include_archived():
+            # Same filterset_fields apply: the archive mirrors the item/product lookups
+            archived = self.filter_queryset(self.get_archived_queryset())
+            response.data = list(response.data) + ArchivedOrderSerializer(archived, many=True).data
+        return response
     
     @extend_schema(
         description="Retrieve an order",
+        parameters=[
+            OpenApiParameter(name="include_archived", type=bool, description="Fall back to archived (settled) orders")
+        ],
         responses={200: OrderSerializer},
         tags=["Orders"]
     )
     def retrieve(self, request, *args, **kwargs):
-        return super().retrieve(request, *args, **kwargs)
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            if not self.include_archived():
+                raise
+        instance = get_object_or_404(self.get_archived_queryset(), pk=kwargs['pk'])
+        return Response(ArchivedOrderSerializer(instance).data)
     
     @extend_schema(
         description="Create a new order (customers only)",
@@ -335,6 +555,276 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated, IsAdmin])
     def mark_paid(self, request, pk=None):
         order = self.get_object()
-        order.payment_status = Order.PAID
-        order.save()
-        return Response({'status': 'marked as paid'})
\ No newline at end of file
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(pk=order.pk)
+            if order.payment_status != Order.PAID:
+                order.payment_status = Order.PAID
+                order.save()
+                record_orders_paid([order.pk])
+                publish_payment_status([order.pk])
+        return Response({'status': 'marked as paid'})
+
+
+# 5. Delta sync for offline terminals
+class SyncViewSet(viewsets.ViewSet):
+    """
+    API endpoint for incremental catalog sync.
+    - Clients pass the `next` token from their previous response as `since`
+    - Start from since=0 to download the full catalog in batches
+    """
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        description="Catalog changes (categories, products, tombstones) after a change token",
+        parameters=[
+            OpenApiParameter(name="since", type=int, description="Change token from the previous sync (0 for a full sync)"),
+            OpenApiParameter(name="limit", type=int, description="Maximum change-log entries per batch")
+        ],
+        responses={
+            200: OpenApiResponse(
+                description="Changed rows and the token to resume from",
+                examples=[
+                    OpenApiExample(
+                        name="Success",
+                        value={
+                            "since": 120,
+                            "next": 125,
+                            "has_more": False,
+                            "categories": [],
+                            "products": [{"id": 3, "seller": "seller1", "category": 2, "name": "Books Item 1",
+                                          "description": "", "price": "30.00", "stock": 61,
+                                          "updated_at": "2025-05-20T10:12:00Z"}],
+                            "deleted": {"categories": [], "products": [7]}
+                        }
+                    )
+                ]
+            )
+        },
+        tags=["Sync"]
+    )
+    def list(self, request):
+        try:
+            since = int(request.query_params.get('since', 0))
+            limit = int(request.query_params.get('limit', settings.SYNC_BATCH_SIZE))
+        except ValueError:
+            raise ValidationError({'detail': 'since and limit must be integers.'})
+        if since < 0 or limit < 1:
+            raise ValidationError({'detail': 'since must be >= 0 and limit >= 1.'})
+        limit = min(limit, settings.SYNC_MAX_BATCH_SIZE)
+        return Response(changes_since(since, limit, user=request.user))
+
+
+
+# 6. Prebuilt catalog snapshot
+class CatalogSnapshotView(APIView):
+    """
+    API endpoint serving the compressed full-catalog snapshot as a static file.
+    - Serves the newest snapshot written by build_catalog_snapshot; clients
+      catch up from its X-Catalog-Token through /api/sync/
+    - ETag is the sha256 of the compressed file; byte ranges are supported
+    - Admins and customers only; sellers sync their own products via /api/sync/
+    """
+    permission_classes = [IsAuthenticated & (IsAdmin | IsCustomer)]
+    range_re = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+    @extend_schema(
+        description=(
+            "Download the full catalog (categories and products) as a compressed JSON "
+            "snapshot. Resume with /api/sync/?since=<X-Catalog-Token>."
+        ),
+        parameters=[
+            OpenApiParameter(name="encoding", type=str, enum=list(ENCODINGS), description="Compression (default gzip)")
+        ],
+        responses={200: OpenApiResponse(description="Compressed catalog file"), 206: None, 304: None, 416: None,
+                   503: OpenApiResponse(description="No snapshot available; sync from since=0 instead")},
+        tags=["Sync"]
+    )
+    def get(self, request):
+        manifest = current_snapshot()
+        if manifest is None:
+            return Response({'detail': 'Catalog snapshot is not available; use /api/sync/?since=0.'}, status=503)
+        encoding = request.query_params.get('encoding', 'gzip')
+        if encoding not in manifest['files']:
+            raise ValidationError({'encoding': f"Available: {', '.join(manifest['files'])}."})
+        info = manifest['files'][encoding]
+        etag = '"%s"' % info['sha256']
+
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return self._finish(not_modified, manifest, etag)
+
+        path = os.path.join(snapshot_dir(), info['name'])
+        size = info['size']
+        byte_range = request.headers.get('Range')
+        match = None
+        if byte_range and request.headers.get('If-Range', etag) == etag:
+            # Multi-range or malformed headers don't match and get the whole file
+            match = self.range_re.match(byte_range.strip())
+        if match:
+            start, end = self._parse_range(match, size)
+            if start is None:
+                response = HttpResponse(status=416)
+                response['Content-Range'] = f'bytes */{size}'
+                return self._finish(response, manifest, etag)
+            try:
+                with open(path, 'rb') as fh:
+                    fh.seek(start)
+                    body = fh.read(end - start + 1)
+            except OSError:  # pruned by a concurrent build; the client retries
+                raise Http404('Snapshot file was replaced.')
+            response = HttpResponse(body, status=206, content_type=ENCODINGS[encoding][1])
+            response['Content-Range'] = f'bytes {start}-{end}/{size}'
+            return self._finish(response, manifest, etag)
+
+        try:
+            fh = open(path, 'rb')
+        except OSError:
+            raise Http404('Snapshot file was replaced.')
+        response = FileResponse(fh, content_type=ENCODINGS[encoding][1],
+                                as_attachment=True, filename=info['name'])
+        return self._finish(response, manifest, etag)
+
+    @staticmethod
+    def _parse_range(match, size):
+        first, last = match.groups()
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            start, end = max(size - int(last), 0), size - 1
+        else:
+            return None, None
+        if start > end or start >= size:
+            return None, None
+        return start, end
+
+    @staticmethod
+    def _finish(response, manifest, etag):
+        response['ETag'] = etag
+        response['Accept-Ranges'] = 'bytes'
+        response['Cache-Control'] = 'private, no-cache'
+        response['X-Catalog-Token'] = str(manifest['token'])
+        return response
+
+
+
+# 7. Account summaries
+class SummaryViewSet(viewsets.ViewSet):
+    """
+    API endpoint for precomputed account figures.
+    - Customers get their order count and spend
+    - Sellers get their units sold and revenue
+    - Admins can look up any user by id
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get_permissions(self):
+        if self.action == 'retrieve':
+            return [IsAuthenticated(), IsAdmin()]
+        return super().get_permissions()
+
+    @staticmethod
+    def summarize(user_id):
+        return AccountSummarySerializer({
+            'user': user_id,
+            'customer': CustomerSummary.objects.filter(pk=user_id).first(),
+            'seller': SellerSummary.objects.filter(pk=user_id).first(),
+        }).data
+
+    @extend_schema(
+        description="Lifetime order figures for the current user",
+        responses={
+            200: OpenApiResponse(
+                response=AccountSummarySerializer,
+                description="Customer and/or seller summary",
+                examples=[
+                    OpenApiExample(
+                        name="Customer",
+                        value={
+                            "user": 4,
+                            "customer": {"order_count": 12, "lifetime_spend": "840.00", "paid_order_count": 10,
+                                         "paid_spend": "700.00", "updated_at": "2025-05-20T10:12:00Z"},
+                            "seller": None
+                        }
+                    )
+                ]
+            )
+        },
+        tags=["Summaries"]
+    )
+    def list(self, request):
+        return Response(self.summarize(request.user.pk))
+
+    @extend_schema(
+        description="Lifetime order figures for any user (admin only)",
+        parameters=[
+            OpenApiParameter(name="id", type=int, location=OpenApiParameter.PATH, description="User id")
+        ],
+        responses={200: AccountSummarySerializer},
+        tags=["Summaries"]
+    )
+    def retrieve(self, request, pk=None):
+        try:
+            user_id = int(pk)
+        except ValueError:
+            raise Http404
+        return Response(self.summarize(user_id))
+
+
+# 8. Live stock and payment events (Server-Sent Events, ASGI only)
+async def event_stream(request):
+    """
+    Push `stock` and `payment` events to dashboards instead of polling.
+    - Authenticate with the usual Bearer header or ?token= (EventSource cannot set headers)
+    - Sellers only receive events for their products and orders containing them
+    - Reconnect with Last-Event-ID (or ?last_event_id=) to resume; a `reset`
+      event means events were missed and the client should refetch
+    """
+    if not isinstance(request, ASGIRequest):
+        return JsonResponse({'detail': 'The event stream is only served over ASGI (config.asgi).'}, status=501)
+
+    user = await sync_to_async(authenticate_stream)(request)
+    if user is None:
+        return JsonResponse({'detail': 'Authentication credentials were not provided or are invalid.'}, status=401)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+
+    async def stream():
+        # Subscribe on first iteration: a client that disconnects before the
+        # body starts never runs the generator, so nothing is left registered
+        subscription, gap = broker.subscribe(user, asyncio.get_running_loop(), last_event_id)
+        try:
+            yield 'retry: 3000\n\n'
+            if gap:
+                yield 'event: reset\ndata: {}\n\n'
+            for event in subscription.backlog:
+                yield event.encode()
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), settings.EVENT_STREAM_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                if event is subscription.OVERFLOW:
+                    yield 'event: overflow\ndata: {}\n\n'
+                    return
+                yield event.encode()
+        finally:
+            broker.unsubscribe(subscription)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def authenticate_stream(request):
+    auth = RevocationCheckingJWTAuthentication()
+    try:
+        token = request.GET.get('token')
+        if token:
+            return auth.get_user(auth.get_validated_token(token))
+        result = auth.authenticate(request)
+        return result[0] if result else None
+    except (InvalidToken, AuthenticationFailed):
+        return None